@@ -1,18 +1,288 @@
+import contextlib
+import itertools
+import logging
+import time
+
 import consts
+import engine
+import heuristics
+import reachability
+import solver
+
+logger = logging.getLogger(__name__)
+
+
+class _NoPhases:
+    """profiling.PhaseTimer stand-in used when profiling is off."""
+
+    current = None
+
+    def phase(self, name):
+        return contextlib.nullcontext()
+
+
+_NO_PHASES = _NoPhases()
+
+
+def play(state, **options):
+    """
+    solve(state, **options), except that a puzzle without a solution found
+    gives [], like a solved one: the moves left to queue in the game.
+    """
+    path = solve(state, **options)
+    return [] if path is None else path
+
+
+def solve(state, time_budget=None, node_budget=None, beam_width=None, cancelled=None, profile=None,
+          pattern_dir=None, external_dir=None, portfolio=None):
+    """
+    Return a solution as a list of (robot color, direction), or None when none
+    is found (the puzzle is unsolvable, or the budget ran out). Without a budget
+    the solution is optimal; with a wall-clock (seconds) or node budget the
+    anytime solver returns the best path found when the budget runs out.
+    beam_width selects a beam search instead, for boards too large to solve
+    exactly; its solutions are usually not optimal. cancelled is an optional
+    callable polled during the search; once it returns True the search stops
+    with the best path found so far (usually none). profile is an optional
+    output path for a profile of this solve (see profiling.Profiler).
+    pattern_dir is an optional patterns.PatternDatabase directory whose tables
+    guide the anytime solver; missing tables are built and saved there.
+    external_dir selects the external-memory breadth-first search, with its
+    layer files in that directory, for exact solves too large for memory.
+    portfolio=True races several solvers in parallel processes instead (see
+    racing.py); a racing.Portfolio selects the configurations to race.
+    """
+    options = (time_budget, node_budget, beam_width, cancelled, pattern_dir, external_dir, portfolio)
+    if profile is None:
+        return _solve(state, *options, _NO_PHASES)
+    import profiling  # only loaded when a profile is asked for
+    with profiling.Profiler(profile) as profiler:
+        return _solve(state, *options, profiler.phases)
+
+
+# Open pattern databases by directory
+_pattern_databases = {}
+
+
+def _solve(state, time_budget, node_budget, beam_width, cancelled, pattern_dir, external_dir, portfolio,
+           phases):
+    started = time.perf_counter()
+    exact = beam_width is None and time_budget is None and node_budget is None
+    with phases.phase("precompute"):
+        puzzle = engine.Puzzle.from_state(state)
+        if not exact:
+            heuristics.BlockerDistance(puzzle)  # builds the cached distance tables
+    budget = None
+    if time_budget is not None or node_budget is not None or cancelled is not None:
+        budget = solver.Budget(time_budget, node_budget, cancelled)
+    with phases.phase("search"):
+        path = reachability.quick_solve(puzzle)
+    try:
+        if path is not None:
+            pass  # easy puzzle, solved optimally without a full search
+        elif portfolio:
+            import racing  # loads multiprocessing, only needed by portfolios
+            if portfolio is True:
+                portfolio = racing.default_portfolio()
+            with phases.phase("search"):
+                path, _ = portfolio.solve(state, time_budget, node_budget, cancelled, pattern_dir)
+        elif external_dir is not None:
+            import external
+            with phases.phase("search"):
+                path = external.bfs(puzzle, external_dir, budget=budget)
+        elif beam_width is not None:
+            with phases.phase("search"):
+                path = solver.beam_search(puzzle, beam_width, budget=budget)
+        elif exact:
+            search = solver.LayeredSearch(puzzle, budget=budget)
+            with phases.phase("search"):
+                search.solve()
+            with phases.phase("reconstruct"):
+                path = next(search.optimal_paths(), None)
+        else:
+            heuristic = None
+            if pattern_dir is not None:
+                with phases.phase("precompute"):
+                    heuristic = _pattern_heuristic(puzzle, pattern_dir)
+            with phases.phase("search"):
+                path = solver.anytime(puzzle, budget, heuristic=heuristic).path
+    except solver.BudgetExceeded:
+        pass
+    if logger.isEnabledFor(logging.DEBUG):
+        elapsed = time.perf_counter() - started
+        logger.debug("Solved %s in %.2f ms: %s moves, %s nodes", state["target"], elapsed * 1000,
+                     None if path is None else len(path), budget.nodes if budget else None,
+                     extra={"solve_ms": elapsed * 1000, "moves": None if path is None else len(path),
+                            "nodes": budget.nodes if budget else None})
+    with phases.phase("reconstruct"):
+        return puzzle.decode(path) if path is not None else None
+
+
+def _pattern_heuristic(puzzle, pattern_dir):
+    import patterns
+    database = _pattern_databases.get(pattern_dir)
+    if database is None:
+        database = _pattern_databases[pattern_dir] = patterns.PatternDatabase(pattern_dir)
+    return patterns.PatternDistance(puzzle, database.table(puzzle.board, puzzle.target_cell))
+
+
+def play_many(states, **options):
+    """
+    Lazily yield play(state, **options) for each state of an iterable, e.g.
+    puzzles.read_jsonl(); only one puzzle is held in memory at a time.
+    """
+    for state in states:
+        yield play(state, **options)
+
+
+def solve_targets(state, targets, time_budget=None, node_budget=None):
+    """
+    Solve many targets for the same board and robots with one search. targets
+    is a list of (color, (x, y)); the state's own target is ignored. Yields
+    (target, solution) as soon as each optimal solution is found, shortest
+    first, then (target, None) for every target that cannot be solved
+    within the budget.
+    """
+    targets = list(targets)
+    puzzle = engine.Puzzle.from_state(dict(state, target=targets[0])) if targets else None
+    solved = set()
+    budget = None
+    if time_budget is not None or node_budget is not None:
+        budget = solver.Budget(time_budget, node_budget)
+    if puzzle is not None:
+        goals = [(puzzle.colors.index(color), puzzle.board.idx(x, y)) for color, (x, y) in targets]
+        try:
+            for i, path in solver.multi_goal_search(puzzle, goals, budget):
+                solved.add(i)
+                yield targets[i], puzzle.decode(path)
+        except solver.BudgetExceeded:
+            pass
+    for i, target in enumerate(targets):
+        if i not in solved:
+            yield target, None
+
+
+def optimal_solutions(state):
+    """
+    Yield every optimal solution as a list of (robot color, direction), all
+    read from one breadth-first search.
+    """
+    puzzle = engine.Puzzle.from_state(state)
+    for path in solver.LayeredSearch(puzzle).optimal_paths():
+        yield puzzle.decode(path)
+
+
+def shortest_solutions(state, k=None, max_length=None):
+    """
+    Yield the k shortest distinct solutions (all of them when k is None) in
+    order of increasing length. The search is extended lazily, never rerun.
+    """
+    puzzle = engine.Puzzle.from_state(state)
+    search = solver.LayeredSearch(puzzle, keep_all_edges=True)
+    for path in itertools.islice(search.shortest_paths(max_length), k):
+        yield puzzle.decode(path)
+
+
+# Depth of the search from a new position towards positions a hint is known for
+HINT_SEARCH_DEPTH = 3
+
+
+class HintSession:
+    """
+    Answers repeated hint requests on one puzzle while the player moves and
+    undoes. Every solved path is remembered backwards from the goal, as the
+    moves left and the next move of each position on it. A request from a
+    remembered position is a lookup; from a position a few moves away it is a
+    shallow search for the cheapest way onto a remembered path. Only when
+    that fails is the position solved with play(), and its path remembered.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self.key = None
+        self.known = {}  # state -> (moves left, next move, next state)
+
+    def hint(self, state, prev_move=None):
+        """
+        Solution from a RicochetRobotsGame state as (robot color, direction)
+        pairs. prev_move is the game's last (robot color, direction), whose
+        reverse the game does not allow as the next move.
+        """
+        puzzle = engine.Puzzle.from_state(state)
+        key = (puzzle.board, puzzle.colors, puzzle.target_robot, puzzle.target_cell)
+        if key != self.key:
+            self.key = key
+            self.known = {}
+        previous = None if prev_move is None else self._encode(puzzle, prev_move)
+        path = self._search(puzzle, previous)
+        if path is None:
+            self._remember(puzzle, [self._encode(puzzle, move) for move in play(state, **self.options)])
+            path = self._search(puzzle, previous)
+        return puzzle.decode(path) if path is not None else []
+
+    @staticmethod
+    def _encode(puzzle, move):
+        color, direction = move
+        return puzzle.colors.index(color) * 4 + consts.DIRECTIONS.index(direction)
+
+    def _remember(self, puzzle, moves):
+        state = puzzle.start
+        states = [state]
+        for move in moves:
+            state = dict(puzzle.successors(state, (move >> 2,)))[move]
+            states.append(state)
+        if not moves or not puzzle.is_goal(state):
+            return
+        for i, move in enumerate(moves):
+            left = len(moves) - i
+            if self.known.get(states[i], (left + 1,))[0] > left:
+                self.known[states[i]] = (left, move, states[i + 1])
 
+    def _follow(self, state):
+        moves = []
+        while state in self.known:
+            _, move, state = self.known[state]
+            moves.append(move)
+        return moves
 
-def play(state):
-    print("AI is thinking...")
-    board = state["board"]
-    robots = state["robots"]
-    target = state["target"]  # (target color, (x, y))
-    print(board)
-    print(robots)
-    print(target)
-    path = [
-        (consts.RED, consts.RIGHT),
-        (consts.GREEN, consts.UP),
-        (consts.BLUE, consts.UP),
-        (consts.YELLOW, consts.UP)
-    ]
-    return path
+    def _search(self, puzzle, previous):
+        """
+        Shortest prefix plus remembered path, or None. The prefix has at most
+        HINT_SEARCH_DEPTH moves and no move reverses the one before it,
+        starting with the game's previous move.
+        """
+        known = self.known
+        h = heuristics.BlockerDistance(puzzle)
+        best = None
+        best_cost = heuristics.UNREACHABLE
+        layer = {puzzle.start: []}
+        seen = {puzzle.start}
+        for depth in range(HINT_SEARCH_DEPTH + 1):
+            for state, prefix in layer.items():
+                last = prefix[-1] if prefix else previous
+                if puzzle.is_goal(state):
+                    cost, suffix = depth, []
+                elif state in known and (last is None or known[state][1] != last ^ 2):
+                    cost, suffix = depth + known[state][0], None
+                else:
+                    continue
+                if cost < best_cost:
+                    best, best_cost = (prefix, suffix, state), cost
+            if best_cost <= depth + 1:
+                break  # anything found deeper costs at least that much
+            next_layer = {}
+            for state, prefix in layer.items():
+                if puzzle.is_goal(state) and prefix:
+                    continue
+                last = prefix[-1] if prefix else previous
+                for move, child in puzzle.successors(state):
+                    if child in seen or (last is not None and move == last ^ 2):
+                        continue
+                    if depth + 1 + h(child) < best_cost:  # else it cannot lead to a better hint
+                        seen.add(child)
+                        next_layer[child] = prefix + [move]
+            layer = next_layer
+        if best is None:
+            return None
+        prefix, suffix, state = best
+        return prefix + (self._follow(state) if suffix is None else suffix)
@@ -0,0 +1,164 @@
+"""
+Asyncio front-end for the solver.
+
+Solves run in a process pool so they never block the event loop. The number
+of concurrent solves is limited, identical puzzles requested while one is
+already in flight share that computation, and a solve nobody waits for any
+more is stopped mid-search through a shared cancel flag polled by its
+Budget.
+
+Board tables live in a tablecache directory that the workers memory-map,
+so they are built once for all workers and shared between them. Jobs name
+their board by id; the board itself is written there once, not pickled
+with every job.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import multiprocessing
+import os
+
+import ai
+import tablecache
+
+# Boards whose id an AsyncSolver remembers, so they are only shared once
+SHARED_BOARDS = 256
+
+# Cancel flags of the worker processes, one per concurrent solve slot
+_worker_flags = None
+
+
+def _init_worker(flags, table_dir):
+    global _worker_flags
+    _worker_flags = flags
+    tablecache.configure(table_dir, share=True)
+
+
+def _solve_in_worker(key, robots, target, options, slot):
+    state = {"board": tablecache.shared_layout(key), "robots": robots, "target": target}
+    return ai.play(state, cancelled=lambda: _worker_flags[slot], **options)
+
+
+def _puzzle_key(state, options):
+    board = tuple(tuple(row) for row in state["board"])
+    robots = tuple(sorted((color, tuple(position)) for color, position in state["robots"].items()))
+    color, position = state["target"]
+    return board, robots, (color, tuple(position)), tuple(sorted(options.items()))
+
+
+class _Job:
+    """One computation in the pool, shared by every caller waiting on it."""
+
+    def __init__(self):
+        self.task = None
+        self.slot = None
+        self.waiters = 0
+
+
+class AsyncSolver:
+    """
+    Dispatches ai.play() calls to a process pool. At most max_concurrent
+    solves run at a time; the others wait their turn without holding a
+    worker. table_dir is the directory of the shared board tables; it
+    defaults to tablecache's directory, else a temporary one removed by
+    close().
+    """
+
+    def __init__(self, max_workers=None, max_concurrent=None, table_dir=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_concurrent = max_concurrent or self.max_workers
+        self._tables = contextlib.ExitStack()
+        self.table_dir = self._tables.enter_context(tablecache.shared_directory(table_dir))
+        self._flags = multiprocessing.RawArray("b", self.max_concurrent)
+        self._free_slots = list(range(self.max_concurrent))
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            self.max_workers, initializer=_init_worker, initargs=(self._flags, self.table_dir))
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._inflight = {}
+        self._layouts = collections.OrderedDict()  # board -> future of its id in table_dir
+
+    def close(self):
+        for job in self._inflight.values():
+            self._cancel(job)
+        self._executor.shutdown(wait=True)
+        self._tables.close()
+
+    async def solve(self, state, *, timeout=None, **options):
+        """
+        Solve a state with ai.play(state, **options). Raises
+        asyncio.TimeoutError after `timeout` seconds; the search itself is
+        then cancelled unless another caller is still waiting for it.
+        """
+        key = _puzzle_key(state, options)
+        job = self._inflight.get(key)
+        if job is None:
+            job = _Job()
+            job.task = asyncio.ensure_future(self._run(job, key[0], state, options))
+            self._inflight[key] = job
+            job.task.add_done_callback(lambda task: self._finished(key, job, task))
+        job.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.task), timeout)
+        finally:
+            job.waiters -= 1
+            if not job.waiters and not job.task.done():
+                self._forget(key, job)
+                self._cancel(job)
+
+    def _shared_layout(self, board):
+        """
+        A future of the id the workers load a board by. Each board is written
+        to table_dir once, in a thread, since that opens and maps its file.
+        """
+        future = self._layouts.get(board)
+        if future is None or (future.done() and (future.cancelled() or future.exception())):
+            loop = asyncio.get_running_loop()
+            future = self._layouts[board] = loop.run_in_executor(None, tablecache.share_layout, board,
+                                                                 self.table_dir)
+        self._layouts.move_to_end(board)
+        while len(self._layouts) > SHARED_BOARDS:
+            self._layouts.popitem(last=False)
+        return future
+
+    async def _run(self, job, board, state, options):
+        key = await asyncio.shield(self._shared_layout(board))  # other solves may wait on it too
+        async with self._semaphore:
+            slot = self._free_slots.pop()
+            self._flags[slot] = 0
+            job.slot = slot
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, _solve_in_worker, key,
+                                                  state["robots"], state["target"], options, slot)
+            finally:
+                job.slot = None
+                self._free_slots.append(slot)
+
+    def _cancel(self, job):
+        if job.slot is None:
+            job.task.cancel()  # still waiting for a slot
+        else:
+            # Cancelling the task would not stop the worker process, and would
+            # free its slot too early. Let the search stop itself instead.
+            self._flags[job.slot] = 1
+
+    def _forget(self, key, job):
+        if self._inflight.get(key) is job:
+            del self._inflight[key]
+
+    def _finished(self, key, job, task):
+        self._forget(key, job)
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter gave up
+
+
+_default_solver = None
+
+
+async def solve(state, *, timeout=None, **options):
+    """solve() on a process-wide AsyncSolver created on first use."""
+    global _default_solver
+    if _default_solver is None:
+        _default_solver = AsyncSolver()
+    return await _default_solver.solve(state, timeout=timeout, **options)
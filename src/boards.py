@@ -0,0 +1,175 @@
+"""
+Random boards assembled from the four double-sided quadrant tiles of the
+physical game, with robots and a target placed at random.
+
+Tile data uses compass letters (N, E, S, W, X for no wall) followed by the
+token on target cells (color and shape), as in the original tile sheets; it
+is converted to the U/R/D/L layout of RicochetRobotsGame when a board is
+built.
+"""
+import functools
+import random
+
+import consts
+
+BOARD_SIZE = 16
+QUAD_SIZE = BOARD_SIZE // 2
+# The walled-in centre cells, where robots are never placed
+CENTER = ((7, 7), (8, 7), (7, 8), (8, 8))
+
+_WALLS = {"N": consts.UP, "E": consts.RIGHT, "S": consts.DOWN, "W": consts.LEFT}
+# Compass letter of the wall after a quarter turn clockwise
+_ROTATED = {"N": "E", "E": "S", "S": "W", "W": "N"}
+
+QUAD_1A = (
+    'NW,N,N,N,NE,NW,N,N,'
+    'W,S,X,X,X,X,SEYH,W,'
+    'WE,NWGT,X,X,X,X,N,X,'
+    'W,X,X,X,X,X,X,X,'
+    'W,X,X,X,X,X,S,X,'
+    'SW,X,X,X,X,X,NEBQ,W,'
+    'NW,X,E,SWRC,X,X,X,S,'
+    'W,X,X,N,X,X,E,NW'
+)
+
+QUAD_1B = (
+    'NW,NE,NW,N,NS,N,N,N,'
+    'W,S,X,E,NWRC,X,X,X,'
+    'W,NEGT,W,X,X,X,X,X,'
+    'W,X,X,X,X,X,SEYH,W,'
+    'W,X,X,X,X,X,N,X,'
+    'SW,X,X,X,X,X,X,X,'
+    'NW,X,E,SWBQ,X,X,X,S,'
+    'W,X,X,N,X,X,E,NW'
+)
+
+QUAD_2A = (
+    'NW,N,N,NE,NW,N,N,N,'
+    'W,X,X,X,X,E,SWBC,X,'
+    'W,S,X,X,X,X,N,X,'
+    'W,NEYT,W,X,X,S,X,X,'
+    'W,X,X,X,E,NWGQ,X,X,'
+    'W,X,SERH,W,X,X,X,X,'
+    'SW,X,N,X,X,X,X,S,'
+    'NW,X,X,X,X,X,E,NW'
+)
+
+QUAD_2B = (
+    'NW,N,N,N,NE,NW,N,N,'
+    'W,X,SERH,W,X,X,X,X,'
+    'W,X,N,X,X,X,X,X,'
+    'WE,SWGQ,X,X,X,X,S,X,'
+    'SW,N,X,X,X,E,NWYT,X,'
+    'NW,X,X,X,X,S,X,X,'
+    'W,X,X,X,X,NEBC,W,S,'
+    'W,X,X,X,X,X,E,NW'
+)
+
+QUAD_3A = (
+    'NW,N,N,NE,NW,N,N,N,'
+    'W,X,X,X,X,SEGH,W,X,'
+    'WE,SWRQ,X,X,X,N,X,X,'
+    'SW,N,X,X,X,X,S,X,'
+    'NW,X,X,X,X,E,NWYC,X,'
+    'W,X,S,X,X,X,X,X,'
+    'W,X,NEBT,W,X,X,X,S,'
+    'W,X,X,X,X,X,E,NW'
+)
+
+QUAD_3B = (
+    'NW,N,NS,N,NE,NW,N,N,'
+    'W,E,NWYC,X,X,X,X,X,'
+    'W,X,X,X,X,X,X,X,'
+    'W,X,X,X,X,E,SWBT,X,'
+    'SW,X,X,X,S,X,N,X,'
+    'NW,X,X,X,NERQ,W,X,X,'
+    'W,SEGH,W,X,X,X,X,S,'
+    'W,N,X,X,X,X,E,NW'
+)
+
+QUAD_4A = (
+    'NW,N,N,NE,NW,N,N,N,'
+    'W,X,X,X,X,X,X,X,'
+    'W,X,X,X,X,SEBH,W,X,'
+    'W,X,S,X,X,N,X,X,'
+    'SW,X,NEGC,W,X,X,X,X,'
+    'NW,S,X,X,X,X,E,SWRT,'
+    'WE,NWYQ,X,X,X,X,X,NS,'
+    'W,X,X,X,X,X,E,NW'
+)
+
+QUAD_4B = (
+    'NW,N,N,NE,NW,N,N,N,'
+    'WE,SWRT,X,X,X,X,S,X,'
+    'W,N,X,X,X,X,NEGC,W,'
+    'W,X,X,X,X,X,X,X,'
+    'W,X,SEBH,W,X,X,X,S,'
+    'SW,X,N,X,X,X,E,NWYQ,'
+    'NW,X,X,X,X,X,X,S,'
+    'W,X,X,X,X,X,E,NW'
+)
+
+QUADS = (
+    (QUAD_1A, QUAD_1B),
+    (QUAD_2A, QUAD_2B),
+    (QUAD_3A, QUAD_3B),
+    (QUAD_4A, QUAD_4B),
+)
+
+
+def _rotate(cells, times):
+    for _ in range(times):
+        cells = [cells[(QUAD_SIZE - 1 - x) * QUAD_SIZE + y]
+                 for y in range(QUAD_SIZE) for x in range(QUAD_SIZE)]
+        cells = ["".join(_ROTATED.get(c, c) for c in cell) for cell in cells]
+    return cells
+
+
+def _split(cell):
+    """Compass wall letters and token (or None) of one tile cell."""
+    walls = "".join(c for c in cell[:2] if c in _WALLS) if len(cell) > 2 else cell
+    token = cell[len(walls):] or None
+    return walls.replace("X", ""), token
+
+
+def create_board(quads=None, rng=random):
+    """
+    Assemble a board from four tiles, given clockwise from the top left, or
+    a random side of each tile in random order. Returns (layout, targets)
+    where targets maps every target cell (x, y) to its token color.
+    """
+    if quads is None:
+        quads = [rng.choice(pair) for pair in QUADS]
+        rng.shuffle(quads)
+    layout, targets = _assemble(tuple(quads))
+    return layout, dict(targets)
+
+
+# There are 384 boards made of the standard tiles
+@functools.lru_cache(maxsize=1024)
+def _assemble(quads):
+    layout = [[None] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+    targets = {}
+    # Tiles are drawn with the board corner top left; each is turned so that
+    # its corner lands on the corner of its quarter.
+    for turns, quad in enumerate(quads):
+        cells = _rotate(quad.split(","), turns)
+        dx, dy = ((0, 0), (1, 0), (1, 1), (0, 1))[turns]
+        for i, cell in enumerate(cells):
+            x = dx * QUAD_SIZE + i % QUAD_SIZE
+            y = dy * QUAD_SIZE + i // QUAD_SIZE
+            walls, token = _split(cell)
+            layout[y][x] = "".join(_WALLS[w] for w in walls) or "_"
+            if token is not None:
+                targets[(x, y)] = token[0]
+    return tuple(tuple(row) for row in layout), targets
+
+
+def random_puzzle(rng=random):
+    """A RicochetRobotsGame state on a random board, with a random target."""
+    board, targets = create_board(rng=rng)
+    free = [(x, y) for y in range(BOARD_SIZE) for x in range(BOARD_SIZE)
+            if (x, y) not in targets and (x, y) not in CENTER]
+    robots = dict(zip(consts.COLORS, rng.sample(free, len(consts.COLORS))))
+    cell = rng.choice(sorted(targets))
+    return {"board": board, "robots": robots, "target": (targets[cell], cell)}
@@ -0,0 +1,184 @@
+"""
+Headless command line tools.
+
+  python cli.py solve puzzles.jsonl solved.jsonl [--time-budget S] [--portfolio]
+  python cli.py convert puzzles.jsonl puzzles.bin
+  python cli.py profile puzzles.jsonl solve.folded [--index N]
+  python cli.py patterns puzzles.jsonl tables/
+  python cli.py rate ratings.csv (--count N [--seed S] | --input puzzles.jsonl)
+  python cli.py thumbnails thumbs/ (--count N [--seed S] | --input puzzles.jsonl)
+
+Use - for stdin/stdout. Files are streamed, so their size is not limited by
+memory.
+"""
+import argparse
+import os
+import sys
+
+import ai
+import engine
+import patterns
+import puzzles
+import racing
+import rating
+
+
+def _open(path, mode):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return path
+
+
+def _play_options(args):
+    options = {
+        "time_budget": args.time_budget,
+        "node_budget": args.node_budget,
+        "beam_width": args.beam_width,
+        "pattern_dir": args.patterns,
+        "external_dir": args.external,
+    }
+    return {k: v for k, v in options.items() if v is not None}
+
+
+def _add_play_options(parser):
+    parser.add_argument("--time-budget", type=float, help="seconds per puzzle (anytime solver)")
+    parser.add_argument("--node-budget", type=int, help="nodes per puzzle (anytime solver)")
+    parser.add_argument("--beam-width", type=int, help="use beam search of this width")
+    parser.add_argument("--patterns", metavar="DIR", help="pattern database directory (anytime solver)")
+    parser.add_argument("--external", metavar="DIR", help="solve exactly with layer files in DIR (large searches)")
+
+
+def solve(args):
+    options = _play_options(args)
+    items = puzzles.read_jsonl(_open(args.input, "r"))
+    if args.portfolio:
+        options["portfolio"] = racing.Portfolio(args.portfolio.split(","))
+
+    def solved():
+        for state, _ in items:
+            yield state, ai.solve(state, **options)  # None leaves the solution out
+
+    puzzles.write_jsonl(_open(args.output, "w"), solved())
+    if args.portfolio:
+        options["portfolio"].close()
+        wins = ", ".join(f"{name} {count}" for name, count in options["portfolio"].wins.most_common())
+        print(f"portfolio wins: {wins or 'none'}", file=sys.stderr)
+
+
+def convert(args):
+    with puzzles.PuzzleWriter(args.output, max_moves=args.max_moves) as writer:
+        for state, solution in puzzles.read_jsonl(_open(args.input, "r")):
+            writer.write(state, solution)
+
+
+def profile(args):
+    for i, (state, _) in enumerate(puzzles.read_jsonl(_open(args.input, "r"))):
+        if i == args.index:
+            path = ai.solve(state, profile=args.output, **_play_options(args))
+            moves = "no solution found" if path is None else f"{len(path)} moves"
+            print(f"{moves}; profile written to {args.output}")
+            return
+    raise SystemExit(f"{args.input} has no puzzle #{args.index}")
+
+
+def build_patterns(args):
+    database = patterns.PatternDatabase(args.directory)
+    built = set()
+    for state, _ in puzzles.read_jsonl(_open(args.input, "r")):
+        puzzle = engine.Puzzle.from_state(state)
+        path = database.path(puzzle.board, puzzle.target_cell)
+        if path not in built and not os.path.exists(path):
+            database.save(puzzle.board, puzzle.target_cell)
+        built.add(path)
+    print(f"{len(built)} pattern tables in {args.directory}")
+
+
+def rate(args):
+    if args.input is not None:
+        rated = rating.rate_states((state for state, _ in puzzles.read_jsonl(_open(args.input, "r"))),
+                                   args.processes, args.node_budget)
+    elif args.count is not None:
+        rated = rating.rate_generated(args.count, args.seed, args.processes, args.node_budget)
+    else:
+        raise SystemExit("rate needs --count or --input")
+    if args.output == "-":
+        rating.write_csv(sys.stdout, rated)
+    else:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            rating.write_csv(f, rated)
+
+
+def thumbnails(args):
+    import render  # pygame is only needed to draw
+    if args.input is not None:
+        states = (state for state, _ in puzzles.read_jsonl(_open(args.input, "r")))
+        paths = render.render_states(args.directory, states, args.processes, args.cell)
+    elif args.count is not None:
+        paths = render.render_generated(args.directory, args.count, args.seed, args.processes, args.cell)
+    else:
+        raise SystemExit("thumbnails needs --count or --input")
+    count = sum(1 for _ in paths)
+    print(f"{count} thumbnails in {args.directory}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ricochet Robots tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    solve_parser = commands.add_parser("solve", help="solve every puzzle of a JSON Lines file")
+    solve_parser.add_argument("input")
+    solve_parser.add_argument("output")
+    _add_play_options(solve_parser)
+    solve_parser.add_argument("--portfolio", nargs="?", const=",".join(racing.DEFAULT_CONFIGURATIONS),
+                              metavar="NAMES", help="race these comma-separated solvers in parallel "
+                              f"(default {','.join(racing.DEFAULT_CONFIGURATIONS)}; also ida-patterns)")
+    solve_parser.set_defaults(func=solve)
+
+    convert_parser = commands.add_parser("convert", help="convert JSON Lines to the binary format")
+    convert_parser.add_argument("input")
+    convert_parser.add_argument("output")
+    convert_parser.add_argument("--max-moves", type=int, default=puzzles.DEFAULT_MAX_MOVES)
+    convert_parser.set_defaults(func=convert)
+
+    profile_parser = commands.add_parser(
+        "profile", help="profile one solve; OUTPUT ending in .prof gets cProfile data, "
+                        "anything else folded stacks for flame graphs")
+    profile_parser.add_argument("input")
+    profile_parser.add_argument("output")
+    profile_parser.add_argument("--index", type=int, default=0, help="puzzle number in INPUT (from 0)")
+    _add_play_options(profile_parser)
+    profile_parser.set_defaults(func=profile)
+
+    patterns_parser = commands.add_parser(
+        "patterns", help="build the pattern tables of every board and target in INPUT")
+    patterns_parser.add_argument("input")
+    patterns_parser.add_argument("directory")
+    patterns_parser.set_defaults(func=build_patterns)
+
+    rate_parser = commands.add_parser(
+        "rate", help="write difficulty ratings of generated or given puzzles as CSV")
+    rate_parser.add_argument("output")
+    rate_parser.add_argument("--count", type=int, help="number of random puzzles to generate")
+    rate_parser.add_argument("--seed", default="0", help="seed of the generated puzzles")
+    rate_parser.add_argument("--input", help="rate the puzzles of a JSON Lines file instead")
+    rate_parser.add_argument("--processes", type=int, help="worker processes (default: all CPUs)")
+    rate_parser.add_argument("--node-budget", type=int, default=rating.RATE_NODE_BUDGET,
+                             help="give up on puzzles needing more nodes")
+    rate_parser.set_defaults(func=rate)
+
+    thumbnails_parser = commands.add_parser(
+        "thumbnails", help="draw generated or given puzzles as PNG files in DIRECTORY")
+    thumbnails_parser.add_argument("directory")
+    thumbnails_parser.add_argument("--count", type=int, help="number of random puzzles to generate")
+    thumbnails_parser.add_argument("--seed", default="0", help="seed of the generated puzzles")
+    thumbnails_parser.add_argument("--input", help="draw the puzzles of a JSON Lines file instead")
+    thumbnails_parser.add_argument("--processes", type=int, help="worker processes (default: all CPUs)")
+    thumbnails_parser.add_argument("--cell", type=int, default=16, help="pixels per cell")
+    thumbnails_parser.set_defaults(func=thumbnails)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Fast move generation shared by the solvers.
+
+The board is flattened to cell indices (index = y * width + x) and a search
+state is a single int that packs one fixed-width field per robot, in the
+order of the state's robots dict. Fields are 8 bits wide on boards of up to
+256 cells and 16 bits wide on larger ones.
+"""
+import functools
+
+import consts
+import tablecache
+
+# Directions are indexed in the order of consts.DIRECTIONS
+DIRECTION_COUNT = len(consts.DIRECTIONS)
+
+
+class Board:
+    """
+    Immutable per-layout tables. For every cell and direction we store the cell
+    a lone robot slides to, so a move only has to check the other robots.
+    """
+
+    def __init__(self, layout, stops=None):
+        self.layout = layout
+        self.height = len(layout)
+        self.width = len(layout[0]) if layout else 0
+        if not self.width or any(len(row) != self.width for row in layout):
+            raise ValueError("board must be a non-empty grid with rows of equal length")
+        self.cells = self.width * self.height
+        if self.cells > 1 << 16:
+            raise ValueError(f"boards are limited to {1 << 16} cells")
+        self.cell_bits = 8 if self.cells <= 1 << 8 else 16
+        self.offsets = (-self.width, 1, self.width, -1)
+        if stops is None:
+            stops = [self._build_stops(d) for d in range(DIRECTION_COUNT)]
+        self.stops = tuple(stops)
+
+    def idx(self, x, y):
+        return y * self.width + x
+
+    def xy(self, index):
+        return index % self.width, index // self.width
+
+    def _blocked(self, index, d):
+        x, y = self.xy(index)
+        dx, dy = consts.DIRECTION_VECTORS[consts.DIRECTIONS[d]]
+        if not (0 <= x + dx < self.width and 0 <= y + dy < self.height):
+            return True
+        return consts.DIRECTIONS[d] in self.layout[y][x]
+
+    def _build_stops(self, d):
+        stops = []
+        for index in range(self.cells):
+            while not self._blocked(index, d):
+                index += self.offsets[d]
+            stops.append(index)
+        return stops
+
+    def destination(self, positions, robot, d):
+        """Cell where `robot` stops when moved in direction index `d`."""
+        start = positions[robot]
+        stop = self.stops[d][start]
+        if stop == start:
+            return start
+        step = self.offsets[d]
+        span = abs(step)
+        if step > 0:
+            for other in positions:
+                if start < other <= stop and (other - start) % span == 0:
+                    stop = other - step
+        else:
+            for other in positions:
+                if stop <= other < start and (start - other) % span == 0:
+                    stop = other - step
+        return stop
+
+
+@functools.lru_cache(maxsize=32)
+def get_board(layout):
+    """Board of a layout, with its stop tables read from tablecache when cached."""
+    stops = tablecache.cached(layout, "stops",
+                              lambda: [stop for stops in Board(layout).stops for stop in stops])
+    cells = len(stops) // DIRECTION_COUNT
+    return Board(layout, [stops[d * cells:(d + 1) * cells] for d in range(DIRECTION_COUNT)])
+
+
+def pack(positions, bits):
+    state = 0
+    for i, position in enumerate(positions):
+        state |= position << (bits * i)
+    return state
+
+
+def unpack(state, count, bits):
+    mask = (1 << bits) - 1
+    return [(state >> (bits * i)) & mask for i in range(count)]
+
+
+class Puzzle:
+    """
+    A board plus a start state and a target, in the packed representation
+    used by the solvers. Moves are encoded as robot * 4 + direction index.
+    """
+
+    def __init__(self, board, colors, positions, target_robot, target_cell):
+        self.board = board
+        self.colors = tuple(colors)
+        self.count = len(positions)
+        self.bits = board.cell_bits
+        self.mask = (1 << self.bits) - 1
+        self.start = pack(positions, self.bits)
+        self.target_robot = target_robot
+        self.target_cell = target_cell
+        self._target_shift = self.bits * target_robot
+
+    @staticmethod
+    def from_state(state):
+        """Build a puzzle from RicochetRobotsGame.get_current_state()."""
+        board = get_board(tuple(tuple(row) for row in state["board"]))
+        robots = state["robots"]
+        color, (tx, ty) = state["target"]
+        colors = tuple(robots)
+        positions = [board.idx(*robots[c]) for c in colors]
+        return Puzzle(board, colors, positions, colors.index(color), board.idx(tx, ty))
+
+    def positions(self, state):
+        return unpack(state, self.count, self.bits)
+
+    def is_goal(self, state):
+        return (state >> self._target_shift) & self.mask == self.target_cell
+
+    def successors(self, state, robots=None):
+        """
+        Yield (move, child state) for every move that changes the state,
+        optionally only for the given robot indices.
+        """
+        positions = unpack(state, self.count, self.bits)
+        destination = self.board.destination
+        bits = self.bits
+        for robot in range(self.count) if robots is None else robots:
+            start = positions[robot]
+            shift = bits * robot
+            for d in range(DIRECTION_COUNT):
+                stop = destination(positions, robot, d)
+                if stop != start:
+                    yield robot * 4 + d, state + ((stop - start) << shift)
+
+    def decode(self, moves):
+        """Translate encoded moves into (robot color, direction) pairs."""
+        return [(self.colors[m >> 2], consts.DIRECTIONS[m & 3]) for m in moves]
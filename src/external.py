@@ -0,0 +1,183 @@
+"""
+Breadth-first search with its layers on disk, for searches whose visited
+states do not fit in memory.
+
+Every depth layer is a file of sorted packed states, each stored as a
+fixed-width big-endian record, so records sort like the states and states
+of any width fit. A layer is expanded by
+streaming the previous one; children are collected in memory up to
+BUFFER_STATES at a time, then sorted and written out as a run. The runs are
+merged, and states already in the sorted file of all visited states are
+dropped by a merge against it, which is then merged with the new layer.
+All file access is sequential, and memory holds at most one buffer of
+children. The solution is read back from the layer files, one pass per
+move.
+
+  python cli.py solve big.jsonl solved.jsonl --external /scratch
+"""
+import heapq
+import itertools
+import os
+import tempfile
+
+# Children kept in memory before they are sorted and written as a run;
+# a Python set of 64-bit states takes about 100 bytes per state
+BUFFER_STATES = 4_000_000
+# Records read or written per I/O call
+_BLOCK = 1 << 16
+
+
+def _record_size(puzzle):
+    return max(1, (puzzle.bits * puzzle.count + 7) // 8)
+
+
+def _read(path, size):
+    """Stream the records of a file written by _write()."""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(_BLOCK * size)
+            if not block:
+                return
+            yield from [block[i:i + size] for i in range(0, len(block), size)]
+
+
+def _write(path, records, size):
+    """Write an iterable of records; returns their number."""
+    records = iter(records)
+    count = 0
+    with open(path, "wb") as f:
+        while True:
+            block = b"".join(itertools.islice(records, _BLOCK))
+            if not block:
+                return count
+            f.write(block)
+            count += len(block) // size
+
+
+def _unique(states):
+    """Drop repeats from a sorted stream."""
+    previous = None
+    for state in states:
+        if state != previous:
+            yield state
+            previous = state
+
+
+def _difference(states, excluded):
+    """States of a sorted stream that are not in another sorted stream."""
+    excluded = iter(excluded)
+    other = next(excluded, None)
+    for state in states:
+        while other is not None and other < state:
+            other = next(excluded, None)
+        if state != other:
+            yield state
+
+
+class ExternalSearch:
+    """
+    Breadth-first search over an engine.Puzzle with its layers in files
+    under `directory` (a temporary directory is created inside it, or in
+    the system's default location, and removed afterwards).
+    """
+
+    def __init__(self, puzzle, directory=None, buffer_states=BUFFER_STATES, budget=None):
+        self.puzzle = puzzle
+        self.directory = directory
+        self.buffer_states = buffer_states
+        self.budget = budget
+        self.record_size = _record_size(puzzle)
+        self.layer_sizes = []  # states per layer
+        self._work = None
+
+    def run(self):
+        """Return one optimal solution as encoded moves, or None when unsolvable."""
+        puzzle = self.puzzle
+        if puzzle.is_goal(puzzle.start):
+            return []
+        with tempfile.TemporaryDirectory(prefix="ricochet-bfs-", dir=self.directory) as work:
+            self._work = work
+            visited = os.path.join(work, "visited")
+            start = [self._record(puzzle.start)]
+            self._write_layer(0, start)
+            _write(visited, start, self.record_size)
+            for depth in itertools.count():
+                goal = self._expand(depth)
+                if goal is not None:
+                    return self._trace_back(depth, goal)
+                if not self.layer_sizes[-1]:
+                    return None
+                merged = os.path.join(work, "visited.next")
+                _write(merged, heapq.merge(_read(visited, self.record_size), self._read_layer(depth + 1)),
+                       self.record_size)
+                os.replace(merged, visited)
+
+    def _record(self, state):
+        return state.to_bytes(self.record_size, "big")
+
+    def _layer_path(self, depth):
+        return os.path.join(self._work, f"layer-{depth}")
+
+    def _read_layer(self, depth):
+        return _read(self._layer_path(depth), self.record_size)
+
+    def _write_layer(self, depth, records):
+        self.layer_sizes.append(_write(self._layer_path(depth), records, self.record_size))
+
+    def _expand(self, depth):
+        """
+        Write layer depth + 1, or return a goal state found among its states
+        (no goal is ever reached twice, so it is new).
+        """
+        puzzle = self.puzzle
+        runs = []
+        buffer = set()
+        for record in self._read_layer(depth):
+            state = int.from_bytes(record, "big")
+            if self.budget is not None:
+                self.budget.spend()
+            for _, child in puzzle.successors(state):
+                if puzzle.is_goal(child):
+                    self._remove_runs(runs)
+                    return child
+                buffer.add(child)
+            if len(buffer) >= self.buffer_states:
+                runs.append(self._write_run(len(runs), buffer))
+                buffer = set()
+        if buffer or not runs:
+            runs.append(self._write_run(len(runs), buffer))
+        children = _unique(heapq.merge(*(_read(run, self.record_size) for run in runs)))
+        visited = _read(os.path.join(self._work, "visited"), self.record_size)
+        self._write_layer(depth + 1, _difference(children, visited))
+        self._remove_runs(runs)
+        return None
+
+    def _write_run(self, index, states):
+        path = os.path.join(self._work, f"run-{index}")
+        _write(path, map(self._record, sorted(states)), self.record_size)
+        return path
+
+    @staticmethod
+    def _remove_runs(runs):
+        for run in runs:
+            os.remove(run)
+
+    def _trace_back(self, depth, goal):
+        """Moves to `goal` from the start, finding each parent by a scan of its layer."""
+        path = []
+        state = goal
+        for d in range(depth, -1, -1):
+            for record in self._read_layer(d):
+                parent = int.from_bytes(record, "big")
+                move = next((m for m, child in self.puzzle.successors(parent) if child == state), None)
+                if move is not None:
+                    path.append(move)
+                    state = parent
+                    break
+        path.reverse()
+        return path
+
+
+def bfs(puzzle, directory=None, budget=None):
+    """Return one optimal solution as encoded moves, or None when unsolvable."""
+    return ExternalSearch(puzzle, directory, budget=budget).run()
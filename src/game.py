@@ -1,9 +1,26 @@
+import collections
+import logging
 import pygame
 import sys
-from src import consts, ai
+import time
+from src import consts, history, render
+from src.model import RicochetRobotsGame
 
-# Desired delay (in milliseconds) between each AI move.
+logger = logging.getLogger(__name__)
+
+# Desired delay (in milliseconds) between each AI move at normal speed.
 AI_MOVE_INTERVAL = 500
+# Playback speed limits; +/- double or halve the speed between them.
+AI_MIN_SPEED = 0.25
+AI_MAX_SPEED = 16.0
+# Wall-clock budget (in seconds) for the AI to find a solution.
+AI_TIME_BUDGET = 2.0
+# File the S and L keys save the game's moves to and load them from.
+RECORDING_PATH = "recording.json"
+# Moves skipped by Page Up / Page Down while reviewing a game.
+REVIEW_STEP = 10
+# Size of the sidebar text.
+FONT_SIZE = 28
 
 GRID_SIZE = 50
 BOARD_SIZE = 16
@@ -27,13 +44,65 @@ DIRECTION_MAP = {
 }
 
 
+class PlaybackScheduler:
+    """
+    Queue of moves released one every `interval_ms / speed` on a monotonic
+    clock. due() returns every move whose time has come, so playback keeps
+    its pace whatever the frame rate, and returns the whole queue at once
+    while fast-forwarding.
+    """
+
+    def __init__(self, interval_ms, clock=time.monotonic):
+        self.interval = interval_ms / 1000
+        self.clock = clock
+        self.queue = collections.deque()
+        self.speed = 1.0
+        self.fast_forward = False
+        self._next_at = 0.0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def start(self, moves):
+        self.queue.clear()
+        self.queue.extend(moves)
+        self.fast_forward = False
+        self._next_at = self.clock() + self.interval / self.speed
+
+    def clear(self):
+        self.queue.clear()
+        self.fast_forward = False
+
+    def set_speed(self, speed):
+        speed = min(max(speed, AI_MIN_SPEED), AI_MAX_SPEED)
+        # Keep the time already waited for the next move in proportion
+        now = self.clock()
+        self._next_at = now + (self._next_at - now) * self.speed / speed
+        self.speed = speed
+
+    def due(self):
+        """Pop and return the moves to play now, in order."""
+        if self.fast_forward:
+            moves = list(self.queue)
+            self.queue.clear()
+            return moves
+        now = self.clock()
+        step = self.interval / self.speed
+        moves = []
+        while self.queue and now >= self._next_at:
+            moves.append(self.queue.popleft())
+            self._next_at += step
+        return moves
+
+
 class RicochetRobotsGUI:
     """
     A GUI class that renders Ricochet Robots and handles both user and AI moves.
     """
 
     def __init__(self):
-        pygame.init()
+        # Only the modules the game uses; fonts are loaded by the first frame
+        pygame.display.init()
         self.screen = pygame.display.set_mode(WINDOW_SIZE)
         pygame.display.set_caption("Ricochet Robots (Pygame)")
         self.clock = pygame.time.Clock()
@@ -41,32 +110,35 @@ class RicochetRobotsGUI:
 
         # The underlying game data
         self.game = RicochetRobotsGame.hard()
-        self.undo_stack = []
+        self.history = history.MoveHistory.from_state(self.game.get_current_state())
         self.selected_robot = None
 
         # A button to trigger AI
         self.ai_button_rect = pygame.Rect(
             BOARD_SIZE * GRID_SIZE + 10,
-            420,
+            540,
             100,
             40
         )
 
         # AI state
         self.is_ai_active = False  # Whether AI is currently animating moves
-        self.ai_moves_queue = []  # List of (robot_color, direction)
-        self.ai_move_timer = 0  # Accumulator for time-based AI stepping
-        self.ai_move_interval = AI_MOVE_INTERVAL  # Delay between AI moves (ms)
+        self.ai_playback = PlaybackScheduler(AI_MOVE_INTERVAL)  # Queued (robot_color, direction)
+        self.hints = None  # Solver state kept between requests, created by the first one
+        self.font = None
+        self.ai_moves_done = 0  # Moves executed during the current playback
+        self.ai_started_at = 0.0  # perf_counter() when the playback started
 
     def run(self):
         """
-        Main loop of the game. We use time-based logic for the AI so that
-        each move is executed with a delay (e.g. 500ms).
+        Main loop of the game. AI moves are released by a clock-driven
+        scheduler, so each move is executed after a delay (e.g. 500ms)
+        independently of the frame rate.
         """
         while self.running:
-            dt = self.clock.tick(60)  # Get the time since last frame in ms
+            self.clock.tick(60)
             self.handle_input()
-            self._update_ai(dt)
+            self._update_ai()
             self.update_screen()
         pygame.quit()
         sys.exit()
@@ -91,15 +163,37 @@ class RicochetRobotsGUI:
                 elif event.key == pygame.K_n:
                     # Reset the game
                     self.game = RicochetRobotsGame.hard()
-                    self.undo_stack.clear()
+                    self.history = history.MoveHistory.from_state(self.game.get_current_state())
                     self.selected_robot = None
                     self.is_ai_active = False
-                    self.ai_moves_queue.clear()
+                    self.ai_playback.clear()
 
                 elif event.key == pygame.K_u:
                     # Undo the last move
-                    if self.undo_stack:
-                        self.game.undo_move(self.undo_stack.pop())
+                    self.review(self.history.cursor - 1)
+
+                elif event.key == pygame.K_i:
+                    # Redo an undone move
+                    self.review(self.history.cursor + 1)
+
+                elif event.key == pygame.K_PAGEUP:
+                    self.review(self.history.cursor - REVIEW_STEP)
+
+                elif event.key == pygame.K_PAGEDOWN:
+                    self.review(self.history.cursor + REVIEW_STEP)
+
+                elif event.key == pygame.K_HOME:
+                    self.review(0)
+
+                elif event.key == pygame.K_END:
+                    self.review(len(self.history))
+
+                elif event.key == pygame.K_s:
+                    self.history.save(RECORDING_PATH)
+                    logger.info("Saved %d moves to %s", len(self.history), RECORDING_PATH)
+
+                elif event.key == pygame.K_l:
+                    self.load_recording(RECORDING_PATH)
 
                 elif event.key in (pygame.K_r, pygame.K_g, pygame.K_b, pygame.K_y):
                     # Select robot
@@ -111,65 +205,112 @@ class RicochetRobotsGUI:
                     # Start AI
                     self.ai_play()
 
+                elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                    self.ai_playback.set_speed(self.ai_playback.speed * 2)
+
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    self.ai_playback.set_speed(self.ai_playback.speed / 2)
+
+                elif event.key == pygame.K_f:
+                    # Finish the AI playback at once
+                    self.ai_playback.fast_forward = True
+
                 elif self.selected_robot and not self.is_ai_active:
                     # Only allow arrow-key moves if AI is not active
                     if event.key in DIRECTION_MAP:
                         direction = DIRECTION_MAP[event.key]
                         try:
-                            data = self.game.execute_move(self.selected_robot, direction)
-                            self.undo_stack.append(data)
+                            self.game.execute_move(self.selected_robot, direction)
+                            self.history.add(self.selected_robot, direction,
+                                             self.game.robots[self.selected_robot])
                         except Exception as ex:
-                            print(f"User move error: {ex}")
+                            logger.debug("User move error: %s", ex)
 
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 # Check for clicking the AI button
                 if self.ai_button_rect.collidepoint(event.pos):
                     self.ai_play()
 
+    def review(self, index):
+        """
+        Show the position after move `index` of the history, clamped to the
+        moves played. Stops any AI playback; a move made from an earlier
+        position drops the moves after it.
+        """
+        index = max(0, min(index, len(self.history)))
+        self.is_ai_active = False
+        self.ai_playback.clear()
+        self.history.seek(index)
+        self.history.restore(self.game)
+
+    def load_recording(self, path):
+        """Replace the game with a recording saved by the S key."""
+        try:
+            recording = history.load(path)
+        except (OSError, ValueError, KeyError) as ex:
+            logger.warning("Cannot load %s: %s", path, ex)
+            return
+        puzzle = recording.puzzle
+        board = puzzle.board
+        self.game = RicochetRobotsGame(
+            board=board.layout,
+            robots=recording.robots(),
+            target=(puzzle.colors[puzzle.target_robot], board.xy(puzzle.target_cell)),
+        )
+        self.history = recording
+        recording.restore(self.game)
+        self.selected_robot = None
+        self.is_ai_active = False
+        self.ai_playback.clear()
+
     def ai_play(self):
         """
         Called when user presses 'A' or clicks the 'AI Play' button.
         We request a move sequence from the AI, then start the AI's
         step-by-step animation.
         """
-        print("AI is activated!")
+        logger.info("AI is activated!")
         # 1) Get the path from AI
-        path = ai.play(self.game.get_current_state())  # list of (robot_color, direction)
-        # 2) Clear old data (optional) or just extend
-        self.ai_moves_queue.clear()
-        # 3) Enqueue all AI moves
-        self.ai_moves_queue.extend(path)
-        # 4) Mark AI as active
+        # list of (robot_color, direction); repeated requests reuse earlier searches
+        if self.hints is None:
+            from src import ai  # the solvers are only loaded once the AI is used
+            self.hints = ai.HintSession(time_budget=AI_TIME_BUDGET)
+        path = self.hints.hint(self.game.get_current_state(), self.game.prev_move)
+        # 2) Replace any queued moves and start the playback clock
+        self.ai_playback.start(path)
+        # 3) Mark AI as active
         self.is_ai_active = True
-        # 5) Reset the AI move timer
-        self.ai_move_timer = 0
+        # 4) Reset the playback statistics
+        self.ai_moves_done = 0
+        self.ai_started_at = time.perf_counter()
 
-    def _update_ai(self, dt):
+    def _update_ai(self):
         """
-        Called once per frame. This function checks if enough time has passed
-        (ai_move_interval) to perform the next AI move in ai_moves_queue.
-
-        :param dt: time in milliseconds since last frame
+        Called once per frame. Executes every AI move whose time has come;
+        several per frame at high speed, the whole rest of the path when
+        fast-forwarding. Only the final position is drawn, by the next
+        update_screen().
         """
         if not self.is_ai_active:
             return  # If AI not active, do nothing
 
-        self.ai_move_timer += dt  # Accumulate time
-        # If we have moves and enough time has passed, execute exactly one move
-        if self.ai_moves_queue and self.ai_move_timer >= self.ai_move_interval:
-            self.ai_move_timer -= self.ai_move_interval  # Reset or subtract interval
-
-            robot_color, direction = self.ai_moves_queue.pop(0)
+        for robot_color, direction in self.ai_playback.due():
             try:
-                data = self.game.execute_move(robot_color, direction)
-                self.undo_stack.append(data)
+                self.game.execute_move(robot_color, direction)
+                self.history.add(robot_color, direction, self.game.robots[robot_color])
+                self.ai_moves_done += 1
             except Exception as ex:
-                print(f"AI move error: {ex}")
+                logger.warning("AI move error: %s", ex)
 
         # If we've exhausted all moves, stop AI
-        if not self.ai_moves_queue:
+        if not self.ai_playback:
             self.is_ai_active = False
-            print("AI has finished its path.")
+            if logger.isEnabledFor(logging.INFO):
+                elapsed = time.perf_counter() - self.ai_started_at
+                rate = self.ai_moves_done / elapsed if elapsed > 0 else 0.0
+                logger.info("AI has finished its path: %d moves in %.2f s (%.1f moves/s)",
+                            self.ai_moves_done, elapsed, rate,
+                            extra={"moves": self.ai_moves_done, "playback_s": elapsed, "moves_per_s": rate})
 
     # -------------------------------------------------------------------------
     #                               DRAW LOGIC
@@ -185,78 +326,56 @@ class RicochetRobotsGUI:
         pygame.display.flip()
 
     def draw_grid(self):
-        for x in range(0, BOARD_SIZE * GRID_SIZE, GRID_SIZE):
-            pygame.draw.line(self.screen, consts.RGB_LIGHT_GRAY, (x, 0), (x, BOARD_SIZE * GRID_SIZE))
-        for y in range(0, BOARD_SIZE * GRID_SIZE, GRID_SIZE):
-            pygame.draw.line(self.screen, consts.RGB_LIGHT_GRAY, (0, y), (BOARD_SIZE * GRID_SIZE, y))
+        render.draw_grid(self.screen, self.game.board, GRID_SIZE)
 
     def draw_walls(self):
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
-                cell = self.game.board[i][j]
-                x, y = j * GRID_SIZE, i * GRID_SIZE
-                wall_size = 5
-
-                if consts.UP in cell:
-                    pygame.draw.line(self.screen, consts.RGB_BLACK, (x, y), (x + GRID_SIZE, y), wall_size)
-                if consts.RIGHT in cell:
-                    pygame.draw.line(self.screen, consts.RGB_BLACK, (x + GRID_SIZE, y),
-                                     (x + GRID_SIZE, y + GRID_SIZE), wall_size)
-                if consts.DOWN in cell:
-                    pygame.draw.line(self.screen, consts.RGB_BLACK, (x, y + GRID_SIZE),
-                                     (x + GRID_SIZE, y + GRID_SIZE), wall_size)
-                if consts.LEFT in cell:
-                    pygame.draw.line(self.screen, consts.RGB_BLACK, (x, y), (x, y + GRID_SIZE), wall_size)
+        render.draw_walls(self.screen, self.game.board, GRID_SIZE)
 
     def draw_target(self):
-        color = consts.COLOR_RGB_MAP.get(self.game.target[0])
-        tx, ty = self.game.target[1]
-        x, y = tx * GRID_SIZE, ty * GRID_SIZE
-        if color is None:
-            raise KeyError(f"key '{self.game.target[0]}' not found in COLOR_MAP")
-        pygame.draw.rect(self.screen, color, (x + 15, y + 15, GRID_SIZE - 30, GRID_SIZE - 30))
+        render.draw_target(self.screen, self.game.target, GRID_SIZE)
 
     def draw_robots(self):
-        for color, (rx, ry) in self.game.robots.items():
-            x_pixel = rx * GRID_SIZE
-            y_pixel = ry * GRID_SIZE
-            pygame.draw.circle(
-                self.screen,
-                consts.COLOR_RGB_MAP[color],
-                (x_pixel + GRID_SIZE // 2, y_pixel + GRID_SIZE // 2),
-                GRID_SIZE // 3
-            )
-            if self.selected_robot == color:
-                pygame.draw.circle(
-                    self.screen,
-                    consts.RGB_BLACK,
-                    (x_pixel + GRID_SIZE // 2, y_pixel + GRID_SIZE // 2),
-                    GRID_SIZE // 3 + 5, 3
-                )
+        render.draw_robots(self.screen, self.game.robots, GRID_SIZE, self.selected_robot)
+
+    def get_font(self):
+        """
+        The sidebar font, loaded once. pygame's default font is used
+        directly; SysFont(None) resolves to it only after scanning every
+        installed font.
+        """
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, FONT_SIZE)
+        return self.font
 
     def draw_sidebar(self):
         sidebar_x = BOARD_SIZE * GRID_SIZE
         pygame.draw.rect(self.screen, consts.RGB_DARK_GRAY, (sidebar_x, 0, UI_WIDTH, WINDOW_HEIGHT))
 
-        font = pygame.font.SysFont(None, 28)
+        font = self.get_font()
         text_lines = [
             "Controls:",
             "N - New Game",
-            "U - Undo Move",
+            "U/I - Undo/Redo Move",
+            "PgUp/PgDn/Home/End - Review",
+            "S/L - Save/Load Game",
             "Arrow Keys - Move",
             "R/G/B/Y - Select Robot",
             "A - AI Play",
+            "+/- - AI Speed",
+            "F - Fast Forward",
             "Esc - Quit",
             "",
             f"Selected: {self.selected_robot or 'None'}",
-            f"Moves: {self.game.step_count}"
+            f"Moves: {self.game.step_count}" + (
+                f" of {len(self.history)}" if self.history.cursor < len(self.history) else "")
         ]
         if self.game.is_at_target():
             text_lines.append("You have won!")
 
         # If AI is active, show some note (optional)
         if self.is_ai_active:
-            text_lines.append("AI is running...")
+            text_lines.append(f"AI is running... ({self.ai_playback.speed:g}x)")
 
         for i, line in enumerate(text_lines):
             text = font.render(line, True, consts.RGB_WHITE)
@@ -266,108 +385,7 @@ class RicochetRobotsGUI:
 
     def draw_ai_button(self):
         pygame.draw.rect(self.screen, consts.RGB_GRAY, self.ai_button_rect)
-        font = pygame.font.SysFont(None, 28)
+        font = self.get_font()
         text_surface = font.render("AI Play", True, consts.RGB_BLACK)
         text_rect = text_surface.get_rect(center=self.ai_button_rect.center)
         self.screen.blit(text_surface, text_rect)
-
-
-class RicochetRobotsGame:
-    """
-    The class that holds board, robots, target, etc.
-    """
-
-    @staticmethod
-    def hard():
-        board_layout = (
-            ('UL', 'U', 'U', 'U', 'UR', 'UL', 'U', 'U', 'U', 'RU', 'LU', 'U', 'U', 'U', 'UD', 'RU'),
-            ('L', '_', 'DR', 'L', '_', '_', '_', '_', '_', '_', '_', '_', '_', 'R', 'LU', 'R'),
-            ('L', '_', 'U', '_', '_', '_', '_', '_', '_', '_', 'R', 'LD', '_', '_', '_', 'R'),
-            ('LR', 'DL', '_', '_', '_', '_', 'D', '_', '_', '_', '_', 'U', '_', '_', '_', 'DR'),
-            ('LD', 'U', '_', '_', '_', 'R', 'UL', '_', '_', '_', '_', '_', '_', '_', '_', 'UR'),
-            ('LU', '_', '_', '_', '_', 'D', '_', '_', '_', '_', '_', '_', '_', '_', '_', 'R'),
-            ('L', '_', '_', '_', '_', 'UR', 'L', 'D', 'D', '_', 'D', '_', '_', 'RD', 'L', 'R'),
-            ('L', '_', '_', '_', '_', '_', 'R', 'UL', 'RU', 'L', 'RU', 'L', '_', 'U', '_', 'R'),
-            ('L', '_', '_', 'D', '_', '_', 'R', 'LD', 'DR', 'L', '_', '_', '_', '_', 'D', 'R'),
-            ('L', '_', '_', 'RU', 'L', '_', '_', 'U', 'U', '_', '_', '_', '_', 'R', 'UL', 'R'),
-            ('L', '_', '_', '_', '_', '_', '_', '_', '_', '_', 'R', 'DL', '_', '_', '_', 'DR'),
-            ('LR', 'LD', '_', '_', '_', '_', '_', '_', '_', 'D', '_', 'U', '_', '_', '_', 'UR'),
-            ('L', 'U', '_', '_', '_', '_', 'RD', 'L', '_', 'UR', 'L', '_', '_', '_', '_', 'R'),
-            ('LD', '_', 'D', '_', '_', '_', 'U', '_', '_', '_', '_', '_', '_', '_', '_', 'R'),
-            ('LU', 'R', 'LU', '_', '_', '_', '_', '_', '_', '_', '_', '_', '_', 'DR', 'L', 'R'),
-            ('LD', 'D', 'D', 'D', 'D', 'RD', 'LD', 'D', 'D', 'D', 'DR', 'DL', 'D', 'DU', 'D', 'DR'),
-        )
-        robots_positions = {
-            consts.RED: (2, 14),
-            consts.GREEN: (0, 3),
-            consts.BLUE: (11, 2),
-            consts.YELLOW: (2, 1)
-        }
-        target = (consts.BLUE, (9, 12))
-        return RicochetRobotsGame(board=board_layout, robots=robots_positions, target=target)
-
-    def __init__(self, board=None, robots=None, target=None):
-        self.board = board
-        self.robots = robots
-        self.target = target
-        self.step_count = 0
-        self.prev_move = None
-
-    def get_current_state(self):
-        return {
-            "board": self.board,
-            "robots": dict(self.robots),
-            "target": self.target
-        }
-
-    def execute_move(self, robot, movement):
-        start_pos = self.robots[robot]
-        if self.prev_move == (robot, consts.OPPOSITE[movement]):
-            raise Exception("Cannot move back immediately.")
-        final_pos = self._compute_destination(robot, movement)
-        if start_pos == final_pos:
-            raise Exception("Move results in no change.")
-        self.step_count += 1
-        self.robots[robot] = final_pos
-        self.prev_move = (robot, movement)
-        return (robot, start_pos, self.prev_move)
-
-    def undo_move(self, move_data):
-        robot, original_pos, prev = move_data
-        self.step_count -= 1
-        self.robots[robot] = original_pos
-        self.prev_move = prev
-
-    def available_moves(self, selection=None):
-        moves = []
-        selection = selection or consts.COLORS
-        for robot in selection:
-            for movement in consts.DIRECTIONS:
-                if self._is_movable(robot, movement):
-                    moves.append((robot, movement))
-        return moves
-
-    def is_at_target(self):
-        return self.target[1] == self.robots[self.target[0]]
-
-    def _is_movable(self, robot, movement):
-        if self.prev_move == (robot, consts.OPPOSITE[movement]):
-            return False
-        x, y = self.robots[robot]
-        if movement in self.board[y][x]:
-            return False
-        dx, dy = consts.DIRECTION_VECTORS[movement]
-        return (x + dx, y + dy) not in self.robots.values()
-
-    def _compute_destination(self, robot, movement):
-        x, y = self.robots[robot]
-        occupied_positions = set(self.robots.values())
-        dx, dy = consts.DIRECTION_VECTORS[movement]
-        while True:
-            if movement in self.board[y][x]:
-                break
-            next_x, next_y = x + dx, y + dy
-            if (next_x, next_y) in occupied_positions:
-                break
-            x, y = next_x, next_y
-        return (x, y)
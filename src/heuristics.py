@@ -0,0 +1,161 @@
+"""
+Admissible estimates of the number of moves left, for the informed solvers.
+"""
+import functools
+
+import engine
+import tablecache
+
+# Distance of cells from which the target cannot be reached at all
+UNREACHABLE = 0xFFFF
+
+
+@functools.lru_cache(maxsize=256)
+def distance_map(board, target_cell):
+    """
+    Moves the target robot needs from every cell when it may stop on any cell
+    of its path (as if a blocker were always available). Unreachable cells
+    get UNREACHABLE.
+    """
+    return tablecache.cached(board.layout, f"distance-{target_cell}",
+                             lambda: _distance_map(board, target_cell))
+
+
+def _distance_map(board, target_cell):
+    distances = [UNREACHABLE] * board.cells
+    distances[target_cell] = 0
+    frontier = [target_cell]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for cell in frontier:
+            # Walk backwards: a robot moving in direction d from any cell on
+            # this ray passes through `cell`.
+            for d, step in enumerate(board.offsets):
+                index = cell - step
+                while 0 <= index < board.cells and _passes(board, index, d, cell):
+                    if distances[index] == UNREACHABLE:
+                        distances[index] = depth
+                        next_frontier.append(index)
+                    index -= step
+        frontier = next_frontier
+    return distances
+
+
+def _passes(board, start, d, cell):
+    """Whether a lone robot sliding from `start` in direction d reaches `cell`."""
+    stop = board.stops[d][start]
+    step = board.offsets[d]
+    if step > 0:
+        return start < cell <= stop
+    return stop <= cell < start
+
+
+@functools.lru_cache(maxsize=32)
+def _sources(board):
+    """sources[d][cell]: cells from which a lone robot moving in direction d stops on cell."""
+    sources = tuple([[] for _ in range(board.cells)] for _ in range(engine.DIRECTION_COUNT))
+    for d, stops in enumerate(board.stops):
+        for start, stop in enumerate(stops):
+            if stop != start:
+                sources[d][stop].append(start)
+    return sources
+
+
+@functools.lru_cache(maxsize=256)
+def lone_distance_map(board, target_cell):
+    """
+    Moves a lone robot (no other robots on the board) needs from every cell
+    to stop on target_cell, so only stopping against walls. Unreachable
+    cells get UNREACHABLE.
+    """
+    return tablecache.cached(board.layout, f"lone-{target_cell}",
+                             lambda: _lone_distance_map(board, target_cell))
+
+
+def _lone_distance_map(board, target_cell):
+    distances = [UNREACHABLE] * board.cells
+    distances[target_cell] = 0
+    frontier = [target_cell]
+    depth = 0
+    sources = _sources(board)
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for cell in frontier:
+            for starts in sources:
+                for start in starts[cell]:
+                    if distances[start] == UNREACHABLE:
+                        distances[start] = depth
+                        next_frontier.append(start)
+        frontier = next_frontier
+    return distances
+
+
+@functools.lru_cache(maxsize=256)
+def blocker_map(board, target_cell):
+    """
+    For a robot on each cell, the smallest distance_map() value of the cells
+    next to it, i.e. of the stops it provides to the target robot.
+    """
+    return tablecache.cached(board.layout, f"blocker-{target_cell}",
+                             lambda: _blocker_map(board, target_cell))
+
+
+def _blocker_map(board, target_cell):
+    distances = distance_map(board, target_cell)
+    near = []
+    for cell in range(board.cells):
+        x, y = board.xy(cell)
+        neighbours = [board.idx(x + dx, y + dy) for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0))
+                      if 0 <= x + dx < board.width and 0 <= y + dy < board.height]
+        near.append(min(distances[n] for n in neighbours) if neighbours else UNREACHABLE)
+    return near
+
+
+class TargetDistance:
+    """h(state) = distance_map() at the target robot's cell."""
+
+    def __init__(self, puzzle):
+        self.table = distance_map(puzzle.board, puzzle.target_cell)
+        self.shift = puzzle.bits * puzzle.target_robot
+        self.mask = puzzle.mask
+
+    def __call__(self, state):
+        return self.table[(state >> self.shift) & self.mask]
+
+
+class BlockerDistance:
+    """
+    TargetDistance plus one move when the any-stop path needs a blocker that
+    no robot can provide without moving first.
+
+    A solution either moves helper robots, costing at least one move on top
+    of the any-stop distance h, or moves only the target robot. The target
+    robot then stops against walls, bounded by lone_distance_map(), or next
+    to a helper robot at some cell x, which takes at least 1 + h(x) moves,
+    bounded by blocker_map() at the helpers' cells.
+    """
+
+    def __init__(self, puzzle):
+        self.table = distance_map(puzzle.board, puzzle.target_cell)
+        lone = lone_distance_map(puzzle.board, puzzle.target_cell)
+        # Cells whose any-stop path cannot be followed using walls alone
+        self.needs_blocker = [lone[c] > h and h < UNREACHABLE for c, h in enumerate(self.table)]
+        self.near = blocker_map(puzzle.board, puzzle.target_cell)
+        self.shift = puzzle.bits * puzzle.target_robot
+        self.mask = puzzle.mask
+        self.helper_shifts = [puzzle.bits * r for r in range(puzzle.count) if r != puzzle.target_robot]
+
+    def __call__(self, state):
+        mask = self.mask
+        cell = (state >> self.shift) & mask
+        h = self.table[cell]
+        if self.needs_blocker[cell]:
+            near = self.near
+            for shift in self.helper_shifts:
+                if near[(state >> shift) & mask] < h:
+                    return h
+            return h + 1
+        return h
@@ -0,0 +1,172 @@
+"""
+Move histories of played games, for undo, redo and reviewing recordings.
+
+Each move is one packed int in an array: the encoded move (robot * 4 +
+direction index, like engine.Puzzle) and the robot's start and stop cells.
+Every SNAPSHOT_INTERVAL moves the packed state is kept as well, so the
+position after any move is rebuilt from the snapshot before it plus fewer
+than SNAPSHOT_INTERVAL records, whatever the length of the game.
+
+Recordings are saved as one JSON object, a puzzles.py line with the moves
+played instead of a solution:
+  {"board_id": "...", "board": [...], "robots": {"R": [x, y], ...},
+   "target": [color, [x, y]], "moves": [[color, direction], ...], "position": 12}
+"position" is the move the recording was at when it was saved.
+"""
+import array
+import json
+
+import consts
+import engine
+from puzzles import board_id
+
+# Moves between two full-state snapshots
+SNAPSHOT_INTERVAL = 64
+
+
+class MoveHistory:
+    """
+    The moves played from the start of an engine.Puzzle, and a cursor into
+    them. Undo and seek only move the cursor; recording a move after an
+    undo drops the moves that were undone.
+    """
+
+    def __init__(self, puzzle):
+        self.puzzle = puzzle
+        self.bits = puzzle.bits
+        self.mask = puzzle.mask
+        self.records = array.array("I" if puzzle.bits == 8 else "Q")
+        self.snapshots = [puzzle.start]  # state after every SNAPSHOT_INTERVAL-th move
+        self.cursor = 0
+        self.state = puzzle.start  # state at the cursor
+
+    @staticmethod
+    def from_state(state):
+        """An empty history starting from RicochetRobotsGame.get_current_state()."""
+        return MoveHistory(engine.Puzzle.from_state(state))
+
+    def __len__(self):
+        return len(self.records)
+
+    def record(self, move, stop):
+        """Add an encoded move whose robot stopped on cell `stop` at the cursor."""
+        del self.records[self.cursor:]
+        del self.snapshots[self.cursor // SNAPSHOT_INTERVAL + 1:]
+        bits = self.bits
+        shift = bits * (move >> 2)
+        start = (self.state >> shift) & self.mask
+        self.records.append((move << (2 * bits)) | (start << bits) | stop)
+        self.state += (stop - start) << shift
+        self.cursor += 1
+        if self.cursor % SNAPSHOT_INTERVAL == 0:
+            self.snapshots.append(self.state)
+
+    def add(self, color, direction, position):
+        """record() for a move of the game: robot color, direction and the robot's new (x, y)."""
+        puzzle = self.puzzle
+        self.record(puzzle.colors.index(color) * 4 + consts.DIRECTIONS.index(direction),
+                    puzzle.board.idx(*position))
+
+    def undo(self):
+        """Step the cursor back one move; False at the start."""
+        if not self.cursor:
+            return False
+        record = self.records[self.cursor - 1]
+        bits = self.bits
+        shift = bits * (record >> (2 * bits + 2))
+        self.state += (((record >> bits) & self.mask) - (record & self.mask)) << shift
+        self.cursor -= 1
+        return True
+
+    def redo(self):
+        """Step the cursor forward one move; False at the end."""
+        if self.cursor == len(self.records):
+            return False
+        self.seek(self.cursor + 1)
+        return True
+
+    def state_at(self, index):
+        """Packed state after the first `index` moves."""
+        if not 0 <= index <= len(self.records):
+            raise IndexError(f"move {index} is outside the history of {len(self.records)} moves")
+        state = self.snapshots[index // SNAPSHOT_INTERVAL]
+        bits, mask = self.bits, self.mask
+        for record in self.records[index - index % SNAPSHOT_INTERVAL:index]:
+            shift = bits * (record >> (2 * bits + 2))
+            state = (state & ~(mask << shift)) | ((record & mask) << shift)
+        return state
+
+    def seek(self, index):
+        """Move the cursor to just after the first `index` moves."""
+        self.state = self.state_at(index)
+        self.cursor = index
+
+    def moves(self):
+        """All recorded moves as (robot color, direction) pairs."""
+        shift = 2 * self.bits
+        return self.puzzle.decode([record >> shift for record in self.records])
+
+    def prev_move(self):
+        """The move before the cursor as (robot color, direction), like RicochetRobotsGame.prev_move."""
+        if not self.cursor:
+            return None
+        return self.puzzle.decode([self.records[self.cursor - 1] >> (2 * self.bits)])[0]
+
+    def robots(self, state=None):
+        """Robot positions of a packed state, the cursor's by default, as {color: (x, y)}."""
+        puzzle = self.puzzle
+        positions = puzzle.positions(self.state if state is None else state)
+        return {color: puzzle.board.xy(cell) for color, cell in zip(puzzle.colors, positions)}
+
+    def restore(self, game):
+        """Put a RicochetRobotsGame in the position at the cursor."""
+        game.robots = self.robots()
+        game.step_count = self.cursor
+        game.prev_move = self.prev_move()
+
+    def save(self, path):
+        puzzle = self.puzzle
+        board = puzzle.board
+        item = {
+            "board_id": board_id(board.layout),
+            "board": board.layout,
+            "robots": self.robots(puzzle.start),
+            "target": (puzzle.colors[puzzle.target_robot], board.xy(puzzle.target_cell)),
+            "moves": self.moves(),
+            "position": self.cursor,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(item, separators=(",", ":")) + "\n")
+
+
+def load(path):
+    """
+    Read a recording written by MoveHistory.save(), replaying its moves by
+    the game's rules. Raises ValueError if one of them is not a legal move,
+    or if the saved position is not one of the moves.
+    """
+    with open(path, encoding="utf-8") as f:
+        item = json.load(f)
+    color, position = item["target"]
+    history = MoveHistory.from_state({
+        "board": item["board"],
+        "robots": {c: tuple(p) for c, p in item["robots"].items()},
+        "target": (color, tuple(position)),
+    })
+    puzzle = history.puzzle
+    previous = None
+    for i, (color, direction) in enumerate(item["moves"]):
+        if color not in puzzle.colors or direction not in consts.DIRECTIONS:
+            raise ValueError(f"{path}: unknown move {color!r} {direction!r} at move {i + 1}")
+        move = puzzle.colors.index(color) * 4 + consts.DIRECTIONS.index(direction)
+        positions = puzzle.positions(history.state)
+        stop = puzzle.board.destination(positions, move >> 2, move & 3)
+        if stop == positions[move >> 2] or (previous is not None and move == previous ^ 2):
+            raise ValueError(f"{path}: illegal move {color} {direction} at move {i + 1}")
+        history.record(move, stop)
+        previous = move
+    cursor = item.get("position", len(history))
+    if not isinstance(cursor, int) or isinstance(cursor, bool) or not 0 <= cursor <= len(history):
+        raise ValueError(f"{path}: position {cursor!r} is not between 0 and {len(history)} moves")
+    history.seek(cursor)
+    return history
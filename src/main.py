@@ -1,4 +1,10 @@
+import logging
+import os
+
 import game
 if __name__ == "__main__":
+    # Set RICOCHET_LOG=INFO (or DEBUG) to see AI activity and timings
+    logging.basicConfig(level=os.environ.get("RICOCHET_LOG", "WARNING"),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     gui = game.RicochetRobotsGUI()
-    gui.run()
\ No newline at end of file
+    gui.run()
@@ -0,0 +1,105 @@
+"""
+Game rules and state, independent of any user interface.
+"""
+import consts
+
+
+class RicochetRobotsGame:
+    """
+    The class that holds board, robots, target, etc.
+    """
+
+    @staticmethod
+    def hard():
+        board_layout = (
+            ('UL', 'U', 'U', 'U', 'UR', 'UL', 'U', 'U', 'U', 'RU', 'LU', 'U', 'U', 'U', 'UD', 'RU'),
+            ('L', '_', 'DR', 'L', '_', '_', '_', '_', '_', '_', '_', '_', '_', 'R', 'LU', 'R'),
+            ('L', '_', 'U', '_', '_', '_', '_', '_', '_', '_', 'R', 'LD', '_', '_', '_', 'R'),
+            ('LR', 'DL', '_', '_', '_', '_', 'D', '_', '_', '_', '_', 'U', '_', '_', '_', 'DR'),
+            ('LD', 'U', '_', '_', '_', 'R', 'UL', '_', '_', '_', '_', '_', '_', '_', '_', 'UR'),
+            ('LU', '_', '_', '_', '_', 'D', '_', '_', '_', '_', '_', '_', '_', '_', '_', 'R'),
+            ('L', '_', '_', '_', '_', 'UR', 'L', 'D', 'D', '_', 'D', '_', '_', 'RD', 'L', 'R'),
+            ('L', '_', '_', '_', '_', '_', 'R', 'UL', 'RU', 'L', 'RU', 'L', '_', 'U', '_', 'R'),
+            ('L', '_', '_', 'D', '_', '_', 'R', 'LD', 'DR', 'L', '_', '_', '_', '_', 'D', 'R'),
+            ('L', '_', '_', 'RU', 'L', '_', '_', 'U', 'U', '_', '_', '_', '_', 'R', 'UL', 'R'),
+            ('L', '_', '_', '_', '_', '_', '_', '_', '_', '_', 'R', 'DL', '_', '_', '_', 'DR'),
+            ('LR', 'LD', '_', '_', '_', '_', '_', '_', '_', 'D', '_', 'U', '_', '_', '_', 'UR'),
+            ('L', 'U', '_', '_', '_', '_', 'RD', 'L', '_', 'UR', 'L', '_', '_', '_', '_', 'R'),
+            ('LD', '_', 'D', '_', '_', '_', 'U', '_', '_', '_', '_', '_', '_', '_', '_', 'R'),
+            ('LU', 'R', 'LU', '_', '_', '_', '_', '_', '_', '_', '_', '_', '_', 'DR', 'L', 'R'),
+            ('LD', 'D', 'D', 'D', 'D', 'RD', 'LD', 'D', 'D', 'D', 'DR', 'DL', 'D', 'DU', 'D', 'DR'),
+        )
+        robots_positions = {
+            consts.RED: (2, 14),
+            consts.GREEN: (0, 3),
+            consts.BLUE: (11, 2),
+            consts.YELLOW: (2, 1)
+        }
+        target = (consts.BLUE, (9, 12))
+        return RicochetRobotsGame(board=board_layout, robots=robots_positions, target=target)
+
+    def __init__(self, board=None, robots=None, target=None):
+        self.board = board
+        self.robots = robots
+        self.target = target
+        self.step_count = 0
+        self.prev_move = None
+
+    def get_current_state(self):
+        return {
+            "board": self.board,
+            "robots": dict(self.robots),
+            "target": self.target
+        }
+
+    def execute_move(self, robot, movement):
+        start_pos = self.robots[robot]
+        if self.prev_move == (robot, consts.OPPOSITE[movement]):
+            raise Exception("Cannot move back immediately.")
+        final_pos = self._compute_destination(robot, movement)
+        if start_pos == final_pos:
+            raise Exception("Move results in no change.")
+        self.step_count += 1
+        self.robots[robot] = final_pos
+        self.prev_move = (robot, movement)
+        return (robot, start_pos, self.prev_move)
+
+    def undo_move(self, move_data):
+        robot, original_pos, prev = move_data
+        self.step_count -= 1
+        self.robots[robot] = original_pos
+        self.prev_move = prev
+
+    def available_moves(self, selection=None):
+        moves = []
+        selection = selection or tuple(self.robots)
+        for robot in selection:
+            for movement in consts.DIRECTIONS:
+                if self._is_movable(robot, movement):
+                    moves.append((robot, movement))
+        return moves
+
+    def is_at_target(self):
+        return self.target[1] == self.robots[self.target[0]]
+
+    def _is_movable(self, robot, movement):
+        if self.prev_move == (robot, consts.OPPOSITE[movement]):
+            return False
+        x, y = self.robots[robot]
+        if movement in self.board[y][x]:
+            return False
+        dx, dy = consts.DIRECTION_VECTORS[movement]
+        return (x + dx, y + dy) not in self.robots.values()
+
+    def _compute_destination(self, robot, movement):
+        x, y = self.robots[robot]
+        occupied_positions = set(self.robots.values())
+        dx, dy = consts.DIRECTION_VECTORS[movement]
+        while True:
+            if movement in self.board[y][x]:
+                break
+            next_x, next_y = x + dx, y + dy
+            if (next_x, next_y) in occupied_positions:
+                break
+            x, y = next_x, next_y
+        return (x, y)
@@ -0,0 +1,180 @@
+"""
+Pattern databases: exact move counts for the target robot plus one helper.
+
+The pattern game keeps only the target robot and one helper robot. Target
+moves are played exactly; the helper may stop on any cell of its path, which
+covers every real helper move whatever the other robots do. A retrograde
+breadth-first search from the goal cells fills one table per board and
+target cell. The table holds one nibble per (target cell, helper cell). Values
+of 15 and more are stored as 15, which keeps them lower bounds.
+
+Tables are written to a directory as <board id>-<target cell>.pdb files (a
+small header, then the nibbles) and memory-mapped when used, so building
+them is an offline step:
+
+  python cli.py patterns puzzles.jsonl tables/
+"""
+import mmap
+import os
+import struct
+
+import heuristics
+from puzzles import board_id
+
+MAGIC = b"RRPD"
+VERSION = 1
+# Pattern tables grow with the square of the cell count
+MAX_CELLS = 1024
+# Largest value a nibble holds
+CAP = 15
+
+_HEADER = struct.Struct("<4s3H")
+_UNSEEN = 0xFF
+
+
+def _target_predecessors(board, target, helper):
+    """Target cells from which one target move, with the helper fixed, stops on `target`."""
+    for d, step in enumerate(board.offsets):
+        if board.stops[d][target] != target and helper != target + step:
+            continue  # nothing stops the target robot here
+        cell = target - step
+        while 0 <= cell < board.cells and cell != helper and heuristics._passes(board, cell, d, target):
+            yield cell
+            cell -= step
+
+
+def _helper_predecessors(board, target, helper):
+    """Helper cells from which the relaxed helper move can end on `helper`."""
+    for d, step in enumerate(board.offsets):
+        cell = helper - step
+        while 0 <= cell < board.cells and cell != target and heuristics._passes(board, cell, d, helper):
+            yield cell
+            cell -= step
+
+
+def build_table(board, target_cell):
+    """Pattern distances of one board and target cell as nibble-packed bytes."""
+    if board.cells > MAX_CELLS:
+        raise ValueError(f"pattern databases are limited to boards of {MAX_CELLS} cells")
+    cells = board.cells
+    distances = bytearray([_UNSEEN]) * (cells * cells)
+    frontier = []
+    for helper in range(cells):
+        if helper != target_cell:
+            distances[target_cell * cells + helper] = 0
+            frontier.append((target_cell, helper))
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for target, helper in frontier:
+            for cell in _target_predecessors(board, target, helper):
+                if distances[cell * cells + helper] == _UNSEEN:
+                    distances[cell * cells + helper] = depth
+                    next_frontier.append((cell, helper))
+            for cell in _helper_predecessors(board, target, helper):
+                if distances[target * cells + cell] == _UNSEEN:
+                    distances[target * cells + cell] = depth
+                    next_frontier.append((target, cell))
+        frontier = next_frontier
+    nibbles = bytearray((len(distances) + 1) // 2)
+    for i, value in enumerate(distances):
+        nibbles[i >> 1] |= min(value, CAP) << ((i & 1) << 2)
+    return bytes(nibbles)
+
+
+class PatternTable:
+    """A memory-mapped table file written by PatternDatabase."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.cells, self.target_cell = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} pattern table")
+
+    def close(self):
+        self._mmap.close()
+
+    def __getitem__(self, pair):
+        target, helper = pair
+        i = target * self.cells + helper
+        return (self._mmap[_HEADER.size + (i >> 1)] >> ((i & 1) << 2)) & CAP
+
+
+class PatternDatabase:
+    """
+    A directory of pattern tables. table() maps the file of a board and
+    target, building and saving it first when build=True.
+    """
+
+    def __init__(self, directory, build=True):
+        self.directory = directory
+        self.build = build
+        self._tables = {}
+
+    def path(self, board, target_cell):
+        return os.path.join(self.directory, f"{board_id(board.layout)}-{target_cell}.pdb")
+
+    def table(self, board, target_cell):
+        """The PatternTable of a board and target, or None when not built."""
+        path = self.path(board, target_cell)
+        table = self._tables.get(path)
+        if table is None:
+            if not os.path.exists(path):
+                if not self.build:
+                    return None
+                self.save(board, target_cell)
+            table = self._tables[path] = PatternTable(path)
+        return table
+
+    def save(self, board, target_cell):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(board, target_cell)
+        data = _HEADER.pack(MAGIC, VERSION, board.cells, target_cell) + build_table(board, target_cell)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            f.write(data)
+        os.replace(partial, path)  # readers never see a half-written table
+
+    def close(self):
+        for table in self._tables.values():
+            table.close()
+        self._tables.clear()
+
+
+class PatternDistance(heuristics.BlockerDistance):
+    """
+    BlockerDistance, also raised by one move when a pattern table proves the
+    target robot and some helper cannot finish in h moves on their own.
+
+    With helper r playing the pattern game, a solution either moves one of
+    the other robots (at least h + 1 moves), or leaves them where they are.
+    In that case it is either a pattern game solution, or some target move
+    stops next to one of the other robots, which takes at least one move plus
+    blocker_map() at that robot's cell.
+    """
+
+    def __init__(self, puzzle, table):
+        super().__init__(puzzle)
+        self.pattern = table
+
+    def __call__(self, state):
+        mask = self.mask
+        cell = (state >> self.shift) & mask
+        h = self.table[cell]
+        if h >= CAP:
+            return super().__call__(state)
+        near = self.near
+        helpers = [(state >> shift) & mask for shift in self.helper_shifts]
+        useful = [helper for helper in helpers if near[helper] < h]
+        if not useful:
+            if self.needs_blocker[cell]:
+                return h + 1
+            pattern = self.pattern
+            for helper in helpers:
+                if pattern[cell, helper] > h:
+                    return h + 1
+        elif len(useful) == 1 and self.pattern[cell, useful[0]] > h:
+            return h + 1  # only that helper could stop the target robot without moving
+        return h
@@ -0,0 +1,110 @@
+"""
+Opt-in profiling of single solves.
+
+Profiler writes either cProfile statistics (paths ending in .prof, for
+snakeviz, flameprof or gprof2dot) or sampled stacks in the folded format
+read by flamegraph.pl, speedscope and inferno (any other path). Samples are
+rooted at the solve phase they were taken in, so a flame graph splits into
+precompute, search and reconstruct. Phase durations are also written next
+to the profile as <path>.phases.json.
+"""
+import collections
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two stack samples
+SAMPLE_INTERVAL = 0.001
+
+
+class PhaseTimer:
+    """Accumulates wall-clock time per named phase."""
+
+    def __init__(self):
+        self.durations = collections.OrderedDict()
+        self.current = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        previous, self.current = self.current, name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - started
+            self.current = previous
+
+
+class _Sampler(threading.Thread):
+
+    def __init__(self, thread_id, phases, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.phases = phases
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(f"phase:{self.phases.current or 'other'}")
+            self.stacks[";".join(reversed(stack))] += 1
+
+
+class Profiler:
+    """
+    Context manager that profiles the code it wraps and writes the result to
+    `path` on exit. Use profiler.phases.phase(name) to mark solve phases.
+    """
+
+    def __init__(self, path, interval=SAMPLE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.phases = PhaseTimer()
+        self._profile = None
+        self._sampler = None
+        self._switch_interval = None
+
+    def __enter__(self):
+        if self.path.endswith(".prof"):
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            # The sampler needs the GIL to take a sample, so hand it over
+            # at least as often as we want samples.
+            self._switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self._switch_interval, self.interval / 2))
+            self._sampler = _Sampler(threading.get_ident(), self.phases, self.interval)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.path)
+        else:
+            self._sampler.stopped.set()
+            self._sampler.join()
+            sys.setswitchinterval(self._switch_interval)
+            with open(self.path, "w", encoding="utf-8") as f:
+                for stack, count in self._sampler.stacks.items():
+                    f.write(f"{stack} {count}\n")
+        with open(self.path + ".phases.json", "w", encoding="utf-8") as f:
+            json.dump({name: seconds * 1000 for name, seconds in self.phases.durations.items()}, f, indent=2)
+        logger.info("Profile written to %s (phases in ms: %s)", self.path,
+                    {name: round(seconds * 1000, 3) for name, seconds in self.phases.durations.items()})
@@ -0,0 +1,298 @@
+"""
+Puzzle files.
+
+JSON Lines files hold one puzzle per line:
+  {"board_id": "...", "board": [...], "robots": {"R": [x, y], ...},
+   "target": [color, [x, y]], "solution": [[color, direction], ...]}
+"board" is only written the first time a board_id appears; later lines
+refer to the same board by id. "solution" is optional.
+
+The binary format stores fixed-size records after a small header, so a file
+can be memory-mapped and its records read in place:
+
+  header   magic b"RRPZ", version, width, height, robot count, max moves,
+           record size (all little-endian uint16 after the magic), then one
+           ASCII byte per robot color
+  record   one wall bitmask byte per cell (U=1, R=2, D=4, L=8),
+           robot cells, target robot index, target cell, solution length
+           (NO_SOLUTION if unknown) and max-moves solution bytes, each move
+           encoded as robot * 4 + direction index like engine.Puzzle
+
+Cells are stored as uint8 on boards of up to 256 cells and uint16 above that.
+"""
+import functools
+import hashlib
+import json
+import mmap
+import struct
+
+import consts
+
+MAGIC = b"RRPZ"
+VERSION = 1
+DEFAULT_MAX_MOVES = 32
+NO_SOLUTION = 0xFF
+
+_HEADER = struct.Struct("<4s6H")
+_WALL_BITS = {direction: 1 << d for d, direction in enumerate(consts.DIRECTIONS)}
+
+
+def board_id(board):
+    """
+    Stable content hash of a board layout. It hashes the walls, not their
+    spelling, so layouts listing the same walls in another order share it.
+    """
+    return _board_id(tuple(map(tuple, board)))
+
+
+@functools.lru_cache(maxsize=1024)
+def _board_id(board):
+    width = len(board[0]) if board else 0
+    return hashlib.sha1(struct.pack("<H", width) + encode_walls(board)).hexdigest()[:16]
+
+
+def _open(file, mode):
+    return open(file, mode, encoding="utf-8") if isinstance(file, str) else _NoClose(file)
+
+
+class _NoClose:
+    """Lets read_jsonl()/write_jsonl() use `with` on a file they did not open."""
+
+    def __init__(self, file):
+        self.file = file
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def read_jsonl(file):
+    """
+    Yield (state, solution) pairs from a JSON Lines file path or open text
+    file, one line at a time. solution is None when the line has none.
+    """
+    boards = {}
+    with _open(file, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            board = item.get("board")
+            if board is not None:
+                board = tuple(map(tuple, board))
+                if "board_id" in item:
+                    boards[item["board_id"]] = board
+            else:
+                try:
+                    board = boards[item["board_id"]]
+                except KeyError:
+                    raise ValueError(f"unknown board id {item.get('board_id')!r}") from None
+            color, position = item["target"]
+            state = {
+                "board": board,
+                "robots": {c: tuple(p) for c, p in item["robots"].items()},
+                "target": (color, tuple(position)),
+            }
+            solution = item.get("solution")
+            yield state, None if solution is None else [tuple(move) for move in solution]
+
+
+def write_jsonl(file, puzzles):
+    """
+    Write (state, solution) pairs to a JSON Lines file path or open text file,
+    storing each distinct board only once. solution may be None.
+    """
+    written = set()
+    with _open(file, "w") as f:
+        for state, solution in puzzles:
+            board = state["board"]
+            key = board_id(board)
+            item = {"board_id": key}
+            if key not in written:
+                written.add(key)
+                item["board"] = board
+            item["robots"] = state["robots"]
+            item["target"] = state["target"]
+            if solution is not None:
+                item["solution"] = solution
+            f.write(json.dumps(item, separators=(",", ":")) + "\n")
+
+
+def _cell_format(width, height):
+    return "B" if width * height <= 1 << 8 else "H"
+
+
+@functools.lru_cache(maxsize=1024)
+def encode_walls(board):
+    """Wall bitmask bytes of a board layout given as a tuple of tuples."""
+    return bytes(sum(bit for direction, bit in _WALL_BITS.items() if direction in cell)
+                 for row in board for cell in row)
+
+
+@functools.lru_cache(maxsize=1024)
+def decode_walls(data, width):
+    """Rebuild a board layout; identical boards share one decoded tuple."""
+    cells = ["".join(d for d, bit in _WALL_BITS.items() if mask & bit) or "_" for mask in data]
+    return tuple(tuple(cells[y:y + width]) for y in range(0, len(cells), width))
+
+
+class _Layout:
+    """Header fields plus the struct of the per-record tail after the walls."""
+
+    def __init__(self, width, height, colors, max_moves):
+        self.width = width
+        self.height = height
+        self.colors = tuple(colors)
+        self.max_moves = max_moves
+        self.cells = width * height
+        cell = _cell_format(width, height)
+        self.tail = struct.Struct(f"<{len(self.colors)}{cell}B{cell}B{max_moves}s")
+        self.record_size = self.cells + self.tail.size
+
+    def header(self):
+        return _HEADER.pack(MAGIC, VERSION, self.width, self.height, len(self.colors),
+                            self.max_moves, self.record_size) + "".join(self.colors).encode("ascii")
+
+
+class PuzzleWriter:
+    """
+    Appends (state, solution) records to a binary puzzle file. The board size
+    and robot colors are taken from the first state written.
+    """
+
+    def __init__(self, path, max_moves=DEFAULT_MAX_MOVES):
+        self.file = open(path, "wb")
+        self.max_moves = max_moves
+        self.layout = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def write(self, state, solution=None):
+        board = state["board"]
+        robots = state["robots"]
+        if self.layout is None:
+            if any(len(color) != 1 for color in robots):
+                raise ValueError("robot colors must be single characters")
+            self.layout = _Layout(len(board[0]), len(board), robots, self.max_moves)
+            self.file.write(self.layout.header())
+        layout = self.layout
+        if tuple(robots) != layout.colors or len(board) != layout.height or len(board[0]) != layout.width:
+            raise ValueError("all puzzles in a file must share board size and robot colors")
+        if solution is not None and len(solution) > layout.max_moves:
+            raise ValueError(f"solution longer than {layout.max_moves} moves")
+        color, (tx, ty) = state["target"]
+        moves = b""
+        length = NO_SOLUTION
+        if solution is not None:
+            length = len(solution)
+            moves = bytes(layout.colors.index(c) * 4 + consts.DIRECTIONS.index(d) for c, d in solution)
+        self.file.write(encode_walls(tuple(map(tuple, board))))
+        self.file.write(layout.tail.pack(
+            *(y * layout.width + x for x, y in robots.values()),
+            layout.colors.index(color), ty * layout.width + tx, length, moves))
+
+
+class Record:
+    """A view of one record in a PuzzleFile; fields are decoded on access."""
+
+    __slots__ = ("_file", "_view")
+
+    def __init__(self, puzzle_file, view):
+        self._file = puzzle_file
+        self._view = view
+
+    @property
+    def walls(self):
+        """The raw wall bitmasks, as a memoryview into the mapped file."""
+        return self._view[:self._file.layout.cells]
+
+    def _tail(self):
+        layout = self._file.layout
+        return layout.tail.unpack_from(self._view, layout.cells)
+
+    @property
+    def robots(self):
+        layout = self._file.layout
+        cells = self._tail()[:len(layout.colors)]
+        return {color: (cell % layout.width, cell // layout.width) for color, cell in zip(layout.colors, cells)}
+
+    @property
+    def target(self):
+        layout = self._file.layout
+        robot, cell = self._tail()[len(layout.colors):len(layout.colors) + 2]
+        return layout.colors[robot], (cell % layout.width, cell // layout.width)
+
+    @property
+    def solution(self):
+        """List of (robot color, direction), or None if not recorded."""
+        layout = self._file.layout
+        length, moves = self._tail()[-2:]
+        if length == NO_SOLUTION:
+            return None
+        return [(layout.colors[m >> 2], consts.DIRECTIONS[m & 3]) for m in moves[:length]]
+
+    def state(self):
+        """The record as a RicochetRobotsGame.get_current_state() dict."""
+        return {
+            "board": decode_walls(bytes(self.walls), self._file.layout.width),
+            "robots": self.robots,
+            "target": self.target,
+        }
+
+
+class PuzzleFile:
+    """
+    Memory-mapped reader for files written by PuzzleWriter. Indexing and
+    iteration hand out Record views without copying the file.
+    """
+
+    def __init__(self, path):
+        self._fileobj = open(path, "rb")
+        self._mmap = mmap.mmap(self._fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, version, width, height, count, max_moves, record_size = _HEADER.unpack_from(self._view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} puzzle file")
+        colors = bytes(self._view[_HEADER.size:_HEADER.size + count]).decode("ascii")
+        self.layout = _Layout(width, height, colors, max_moves)
+        if self.layout.record_size != record_size:
+            raise ValueError(f"{path} has an inconsistent record size")
+        self._offset = _HEADER.size + count
+        self._count = (len(self._view) - self._offset) // record_size
+
+    def close(self):
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # Records still alive keep the mapping open until collected
+        self._fileobj.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if not -self._count <= i < self._count:
+            raise IndexError("record index out of range")
+        start = self._offset + (i % self._count) * self.layout.record_size
+        return Record(self, self._view[start:start + self.layout.record_size])
+
+    def __iter__(self):
+        size = self.layout.record_size
+        for start in range(self._offset, self._offset + self._count * size, size):
+            yield Record(self, self._view[start:start + size])
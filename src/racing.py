@@ -0,0 +1,173 @@
+"""
+Portfolio solving: several solver configurations race on the same puzzle.
+
+No configuration wins everywhere: breadth-first search is fastest on short
+puzzles, IDA* on long ones. A Portfolio keeps one worker process per
+configuration and starts them all on each puzzle. The first optimal
+solution wins and the other searches are stopped. With a budget, the
+shortest solution found when every search has stopped is returned. Wins are
+counted per configuration, to tune the defaults.
+
+As in aio.py, the workers memory-map the board tables of a tablecache
+directory, and puzzles name their board by id instead of carrying it.
+
+  ai.play(state, portfolio=True)
+"""
+import atexit
+import collections
+import concurrent.futures
+import contextlib
+import logging
+import multiprocessing
+import time
+
+import engine
+import patterns
+import solver
+import tablecache
+
+logger = logging.getLogger(__name__)
+
+
+def _bfs(puzzle, budget, pattern_dir):
+    return solver.bfs(puzzle, budget), True
+
+
+def _ida(puzzle, budget, pattern_dir):
+    return solver.IDAStar(puzzle, budget=budget).run(), True
+
+
+def _ida_patterns(puzzle, budget, pattern_dir):
+    table = patterns.PatternDatabase(pattern_dir).table(puzzle.board, puzzle.target_cell)
+    return solver.IDAStar(puzzle, patterns.PatternDistance(puzzle, table), budget).run(), True
+
+
+def _anytime(puzzle, budget, pattern_dir):
+    result = solver.anytime(puzzle, budget)
+    return result.path, result.optimal
+
+
+# Solver configurations by name: f(puzzle, budget, pattern_dir) -> (path, optimal)
+CONFIGURATIONS = {
+    "bfs": _bfs,
+    "ida": _ida,
+    "ida-patterns": _ida_patterns,
+    "anytime": _anytime,
+}
+DEFAULT_CONFIGURATIONS = ("bfs", "ida", "anytime")
+# Seconds between two polls of the caller's cancelled() callback
+POLL_INTERVAL = 0.01
+# Boards whose id a Portfolio remembers, so they are only shared once
+SHARED_BOARDS = 256
+
+# Number of the puzzle the workers should be solving; a search stops as soon
+# as it no longer matches the number it was started with
+_current_job = None
+
+
+def _init_worker(current_job, table_dir):
+    global _current_job
+    _current_job = current_job
+    tablecache.configure(table_dir, share=True)
+
+
+def _race_in_worker(name, job, key, robots, target, time_budget, node_budget, pattern_dir):
+    state = {"board": tablecache.shared_layout(key), "robots": robots, "target": target}
+    puzzle = engine.Puzzle.from_state(state)
+    budget = solver.Budget(time_budget, node_budget, cancelled=lambda: _current_job.value != job)
+    try:
+        path, optimal = CONFIGURATIONS[name](puzzle, budget, pattern_dir)
+    except solver.BudgetExceeded:
+        path, optimal = None, False
+    return path, optimal and path is not None, budget.nodes
+
+
+class Portfolio:
+    """
+    Races `configurations` (names of CONFIGURATIONS) on each puzzle in a
+    pool with one worker process per configuration. wins counts the
+    configuration whose solution was returned. table_dir is the directory
+    of the shared board tables; it defaults to tablecache's directory, else
+    a temporary one removed by close().
+    """
+
+    def __init__(self, configurations=DEFAULT_CONFIGURATIONS, table_dir=None):
+        unknown = set(configurations) - set(CONFIGURATIONS)
+        if unknown:
+            raise ValueError(f"unknown portfolio configurations: {', '.join(sorted(unknown))}")
+        self.configurations = tuple(configurations)
+        self.wins = collections.Counter()
+        self._current_job = multiprocessing.RawValue("q", 0)
+        self._jobs = 0
+        self._tables = contextlib.ExitStack()
+        self.table_dir = self._tables.enter_context(tablecache.shared_directory(table_dir))
+        self._layouts = collections.OrderedDict()  # board -> its id in table_dir
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            len(self.configurations), initializer=_init_worker, initargs=(self._current_job, self.table_dir))
+
+    def close(self):
+        self._current_job.value = 0
+        self._executor.shutdown(wait=True)
+        self._tables.close()
+
+    def _shared_layout(self, layout):
+        board = tuple(map(tuple, layout))
+        key = self._layouts.get(board)
+        if key is None:
+            key = self._layouts[board] = tablecache.share_layout(board, self.table_dir)
+        self._layouts.move_to_end(board)
+        while len(self._layouts) > SHARED_BOARDS:
+            self._layouts.popitem(last=False)
+        return key
+
+    def solve(self, state, time_budget=None, node_budget=None, cancelled=None, pattern_dir=None):
+        """
+        Return (encoded moves or None, winning configuration or None). Each
+        configuration gets the whole budget. "ida-patterns" only runs when
+        pattern_dir is given.
+        """
+        configurations = self.configurations
+        if pattern_dir is None:
+            configurations = tuple(name for name in configurations if name != "ida-patterns")
+        key = self._shared_layout(state["board"])
+        self._jobs += 1
+        job = self._current_job.value = self._jobs
+        started = time.perf_counter()
+        futures = {self._executor.submit(_race_in_worker, name, job, key, state["robots"], state["target"],
+                                         time_budget, node_budget, pattern_dir): name
+                   for name in configurations}
+        best, winner = None, None
+        try:
+            pending = set(futures)
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending, POLL_INTERVAL if cancelled else None, concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    path, optimal, _ = future.result()
+                    if path is not None and (best is None or len(path) < len(best)):
+                        best, winner = path, futures[future]
+                    if optimal:
+                        pending = ()
+                        break
+                if cancelled is not None and cancelled():
+                    break
+        finally:
+            self._current_job.value = 0  # stops the searches still running
+        if winner is not None:
+            self.wins[winner] += 1
+        logger.debug("Portfolio solved %s in %.2f ms: %s won with %s moves", state["target"],
+                     (time.perf_counter() - started) * 1000, winner, None if best is None else len(best),
+                     extra={"winner": winner})
+        return best, winner
+
+
+_default_portfolio = None
+
+
+def default_portfolio():
+    """A process-wide Portfolio of DEFAULT_CONFIGURATIONS, created on first use and closed at exit."""
+    global _default_portfolio
+    if _default_portfolio is None:
+        _default_portfolio = Portfolio()
+        atexit.register(_default_portfolio.close)  # removes its table directory
+    return _default_portfolio
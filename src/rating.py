@@ -0,0 +1,156 @@
+"""
+Difficulty ratings of puzzles for the puzzle feed.
+
+One solve per puzzle yields every metric: IDA* (or the easy-puzzle fast path)
+finds the optimal length, then a layered search restricted to states that can
+still finish in that many moves counts the optimal solutions and the fewest
+robots any of them moves. Puzzles are rated in parallel worker processes;
+generated puzzles are built inside the workers from (seed, index), so only
+ratings cross process boundaries. Workers share their board tables through
+a tablecache directory, and puzzles read from files are sent to them with
+their board id in place of the board.
+
+  python cli.py rate ratings.csv --count 100000 --seed 1
+"""
+import collections
+import contextlib
+import csv
+import multiprocessing
+import random
+import time
+
+import boards
+import engine
+import heuristics
+import reachability
+import solver
+import tablecache
+from puzzles import board_id
+
+# Node budget per puzzle; harder puzzles are reported without a rating
+RATE_NODE_BUDGET = 2_000_000
+
+Rating = collections.namedtuple("Rating", "moves robots_used optimal_solutions nodes branching solve_ms")
+
+CSV_COLUMNS = ("index", "board_id", "target_color", "target_x", "target_y") + Rating._fields
+
+
+def _effective_branching(nodes, depth):
+    """b such that b + b^2 + ... + b^depth == nodes, the usual search-effort measure."""
+    if depth == 0 or nodes <= depth:
+        return 1.0
+    low, high = 1.0, float(nodes)
+    for _ in range(50):
+        b = (low + high) / 2
+        if sum(b ** i for i in range(1, depth + 1)) < nodes:
+            low = b
+        else:
+            high = b
+    return low
+
+
+def _optimal_counts(puzzle, heuristic, length, budget):
+    """
+    Number of optimal solutions and the fewest robots one of them moves,
+    from a layered search that drops states with depth + h > length.
+    """
+    counts = {puzzle.start: 1}
+    robot_sets = {puzzle.start: {0}}  # bitmasks of the robots moved on the way
+    layer = [puzzle.start]
+    for depth in range(1, length + 1):
+        next_counts = {}
+        next_sets = {}
+        for state in layer:
+            budget.spend()
+            for move, child in puzzle.successors(state):
+                if depth + heuristic(child) > length:
+                    continue
+                if child not in next_counts:
+                    next_counts[child] = 0
+                    next_sets[child] = set()
+                next_counts[child] += counts[state]
+                robot = 1 << (move >> 2)
+                next_sets[child].update(mask | robot for mask in robot_sets[state])
+        counts, robot_sets = next_counts, next_sets
+        layer = list(counts)
+    goals = [state for state in layer if puzzle.is_goal(state)]
+    solutions = sum(counts[state] for state in goals)
+    robots = min(bin(mask).count("1") for state in goals for mask in robot_sets[state])
+    return solutions, robots
+
+
+def rate(state, node_budget=RATE_NODE_BUDGET):
+    """Rate one RicochetRobotsGame state; moves is None when unsolved within the budget."""
+    started = time.perf_counter()
+    puzzle = engine.Puzzle.from_state(state)
+    heuristic = heuristics.BlockerDistance(puzzle)
+    budget = solver.Budget(nodes=node_budget)
+    try:
+        path = reachability.quick_solve(puzzle)
+        if path is None:
+            path = solver.IDAStar(puzzle, heuristic, budget).run()
+        if path is None:
+            return Rating(None, None, 0, budget.nodes, None, (time.perf_counter() - started) * 1000)
+        solutions, robots = _optimal_counts(puzzle, heuristic, len(path), budget)
+    except solver.BudgetExceeded:
+        return Rating(None, None, None, budget.nodes, None, (time.perf_counter() - started) * 1000)
+    return Rating(len(path), robots, solutions, budget.nodes, _effective_branching(budget.nodes, len(path)),
+                  (time.perf_counter() - started) * 1000)
+
+
+def generated_puzzle(seed, index):
+    """The index-th random puzzle of a seed; the same on every run and process."""
+    return boards.random_puzzle(random.Random(f"{seed}:{index}"))
+
+
+def _rate_generated(job):
+    seed, index, node_budget = job
+    return rate(generated_puzzle(seed, index), node_budget)
+
+
+def _rate_state(job):
+    key, robots, target, node_budget = job
+    return rate({"board": tablecache.shared_layout(key), "robots": robots, "target": target}, node_budget)
+
+
+@contextlib.contextmanager
+def _pool(processes):
+    """A worker pool sharing its board tables; yields (pool, table directory)."""
+    with tablecache.shared_directory() as directory:
+        with multiprocessing.Pool(processes, tablecache.configure, (directory, True)) as pool:
+            yield pool, directory
+
+
+def rate_generated(count, seed=0, processes=None, node_budget=RATE_NODE_BUDGET):
+    """Yield (index, state, Rating) for `count` generated puzzles, in order."""
+    jobs = ((seed, index, node_budget) for index in range(count))
+    with _pool(processes) as (pool, _):
+        for index, rating in enumerate(pool.imap(_rate_generated, jobs, chunksize=16)):
+            yield index, generated_puzzle(seed, index), rating
+
+
+def rate_states(states, processes=None, node_budget=RATE_NODE_BUDGET):
+    """Yield (index, state, Rating) for an iterable of states, in order."""
+    states = iter(states)
+    pending = collections.deque()
+
+    def jobs(directory):
+        for state in states:
+            pending.append(state)
+            key = tablecache.share_layout(state["board"], directory)
+            yield key, state["robots"], state["target"], node_budget
+
+    with _pool(processes) as (pool, directory):
+        for index, rating in enumerate(pool.imap(_rate_state, jobs(directory), chunksize=16)):
+            yield index, pending.popleft(), rating
+
+
+def write_csv(file, rated):
+    """Write (index, state, Rating) triples as CSV rows with CSV_COLUMNS to an open text file."""
+    writer = csv.writer(file)
+    writer.writerow(CSV_COLUMNS)
+    for index, state, rating in rated:
+        color, (x, y) = state["target"]
+        writer.writerow((index, board_id(state["board"]), color, x, y) + tuple(
+            "" if value is None else round(value, 3) if isinstance(value, float) else value
+            for value in rating))
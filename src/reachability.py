@@ -0,0 +1,100 @@
+"""
+Fast path for easy puzzles.
+
+Most puzzles are solved by the target robot alone, or by one helper move
+followed by target robot moves. quick_solve() looks for such solutions with
+tiny searches over the target robot's cell only, and returns one when it can
+prove it optimal, so a full search is only started for the rest.
+"""
+import engine
+import heuristics
+
+
+def _follow(puzzle, positions, distances):
+    """
+    Walk the target robot down the lone-robot distances, checking every move
+    against the other robots. Returns encoded moves, or None when a robot is
+    in the way.
+    """
+    robot = puzzle.target_robot
+    destination = puzzle.board.destination
+    positions = list(positions)
+    path = []
+    while positions[robot] != puzzle.target_cell:
+        wanted = distances[positions[robot]] - 1
+        for d in range(engine.DIRECTION_COUNT):
+            stop = destination(positions, robot, d)
+            if distances[stop] == wanted:
+                positions[robot] = stop
+                path.append(robot * 4 + d)
+                break
+        else:
+            return None
+    return path
+
+
+def _target_path(puzzle, positions, bound, estimate):
+    """
+    Shortest sequence of at most `bound` target robot moves, with the other
+    robots fixed where they are, or None.
+    """
+    robot = puzzle.target_robot
+    destination = puzzle.board.destination
+    positions = list(positions)
+    start = positions[robot]
+    best = {}
+    path = []
+
+    def walk(cell, g, limit):
+        if cell == puzzle.target_cell:
+            return True
+        if g + estimate[cell] > limit or best.get(cell, limit + 1) <= g:
+            return False
+        best[cell] = g
+        for d in range(engine.DIRECTION_COUNT):
+            positions[robot] = cell
+            stop = destination(positions, robot, d)
+            if stop != cell:
+                path.append(robot * 4 + d)
+                if walk(stop, g + 1, limit):
+                    return True
+                path.pop()
+        return False
+
+    for limit in range(estimate[start], bound + 1):
+        best.clear()
+        if walk(start, 0, limit):
+            return path
+    return None
+
+
+def quick_solve(puzzle):
+    """
+    Return an optimal solution as encoded moves if one is found that uses at
+    most one helper move, played first, else None.
+
+    Every helper move costs one move on top of the target robot's any-stop
+    distance h (heuristics.distance_map), so a target-only solution of at
+    most h + 1 moves, or a one-helper solution of h + 1 moves, is optimal.
+    """
+    positions = puzzle.positions(puzzle.start)
+    estimate = heuristics.distance_map(puzzle.board, puzzle.target_cell)
+    h = estimate[positions[puzzle.target_robot]]
+    if h == 0:
+        return []
+    if h >= heuristics.UNREACHABLE:
+        return None
+    distances = heuristics.lone_distance_map(puzzle.board, puzzle.target_cell)
+    if distances[positions[puzzle.target_robot]] == h:
+        path = _follow(puzzle, positions, distances)
+        if path is not None:
+            return path
+    path = _target_path(puzzle, positions, h + 1, estimate)
+    if path is not None:
+        return path
+    helpers = [r for r in range(puzzle.count) if r != puzzle.target_robot]
+    for move, child in puzzle.successors(puzzle.start, helpers):
+        path = _target_path(puzzle, puzzle.positions(child), h, estimate)
+        if path is not None:
+            return [move] + path
+    return None
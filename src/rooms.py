@@ -0,0 +1,340 @@
+"""
+Headless multi-room game server.
+
+Run it with: python rooms.py [host:port | /path/to/socket]
+
+One asyncio process hosts any number of rooms, each a game of its own that
+players join and move in. Rooms keep only a packed engine state and a
+compact move history (history.MoveHistory); the immutable board tables
+are shared by every room on the same board, and moves are checked with
+them instead of walking the board.
+
+The protocol is newline-delimited JSON. Clients send
+  {"op": "join", "room": "r1"}            optionally with "board", "robots"
+                                          and "target" to create the room
+  {"op": "move", "robot": "R", "direction": "U"}
+  {"op": "review", "move": 12}            the position after the 12th move
+  {"op": "leave"}
+The server answers a join, and a review, with the room's full state,
+  {"event": "state", "room": "r1", "board": [...], "robots": {...},
+   "target": [color, [x, y]], "moves": 0}
+where "moves" is the number of moves played to reach it,
+and broadcasts the moves made in a room, batched per event loop iteration:
+  {"event": "moves", "room": "r1", "moves": [[player, color, direction, [x, y]], ...],
+   "solved": false}
+Rejected requests get {"event": "error", "error": "..."}.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import socket
+import sys
+import weakref
+
+import boards
+import consts
+import engine
+import history
+from puzzles import board_id
+from service import parse_address
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = ("127.0.0.1", 8751)
+# Clients whose unsent output grows beyond this many bytes are disconnected
+MAX_CLIENT_BUFFER = 1 << 20
+
+# Board tables shared by all rooms on a board, dropped with the last room
+_boards = weakref.WeakValueDictionary()
+
+
+def _shared_board(layout):
+    key = board_id(layout)
+    board = _boards.get(key)
+    if board is None:
+        board = _boards[key] = engine.Board(tuple(tuple(row) for row in layout))
+    return board
+
+
+def _cell(board, position, what):
+    """The index of an (x, y) position on the board; a ValueError when it is off the board."""
+    if (not isinstance(position, (list, tuple)) or len(position) != 2
+            or not all(isinstance(v, int) and not isinstance(v, bool) for v in position)):
+        raise ValueError(f"{what} must be an [x, y] pair of integers")
+    x, y = position
+    if not (0 <= x < board.width and 0 <= y < board.height):
+        raise ValueError(f"{what} {[x, y]} is off the {board.width}x{board.height} board")
+    return board.idx(x, y)
+
+
+class Room:
+    """
+    The server side of one RicochetRobotsGame: the same rules on a packed
+    engine state and its history.MoveHistory, plus the players in the room
+    and the moves not yet broadcast to them.
+    """
+
+    __slots__ = ("name", "puzzle", "history", "members", "pending", "__weakref__")
+
+    def __init__(self, name, game_state):
+        """Raises ValueError when a robot or the target is off the board, or robots share a cell."""
+        self.name = name
+        board = _shared_board(game_state["board"])
+        robots = game_state["robots"]
+        color, target = game_state["target"]
+        if color not in robots:
+            raise ValueError(f"the target color {color!r} is not one of the robots")
+        positions = [_cell(board, position, f"robot {robot}") for robot, position in robots.items()]
+        if len(set(positions)) != len(positions):
+            raise ValueError("two robots are on the same cell")
+        self.puzzle = engine.Puzzle(board, robots, positions, list(robots).index(color),
+                                    _cell(board, target, "target"))
+        self.history = history.MoveHistory(self.puzzle)
+        self.members = set()
+        self.pending = []
+
+    @property
+    def step_count(self):
+        return self.history.cursor
+
+    def is_at_target(self):
+        return self.puzzle.is_goal(self.history.state)
+
+    def execute_move(self, color, direction):
+        """Apply a move; returns the robot's new cell. Raises ValueError like the game's rules."""
+        puzzle = self.puzzle
+        if color not in puzzle.colors or direction not in consts.DIRECTIONS:
+            raise ValueError("Unknown robot or direction.")
+        if self.history.prev_move() == (color, consts.OPPOSITE[direction]):
+            raise ValueError("Cannot move back immediately.")
+        robot = puzzle.colors.index(color)
+        positions = puzzle.positions(self.history.state)
+        d = consts.DIRECTIONS.index(direction)
+        stop = puzzle.board.destination(positions, robot, d)
+        if stop == positions[robot]:
+            raise ValueError("Move results in no change.")
+        self.history.record(robot * 4 + d, stop)
+        return stop
+
+    def get_current_state(self, index=None):
+        """The game state after `index` moves, by default after the last one."""
+        puzzle = self.puzzle
+        board = puzzle.board
+        state = self.history.state if index is None else self.history.state_at(index)
+        return {
+            "board": board.layout,
+            "robots": self.history.robots(state),
+            "target": (puzzle.colors[puzzle.target_robot], board.xy(puzzle.target_cell)),
+        }
+
+
+class _Player:
+
+    __slots__ = ("name", "writer", "room")
+
+    def __init__(self, name, writer):
+        self.name = name
+        self.writer = writer
+        self.room = None
+
+    def send(self, line):
+        transport = self.writer.transport
+        if transport.is_closing():
+            return
+        if transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+            logger.warning("Disconnecting %s: not reading its messages", self.name)
+            transport.abort()
+            return
+        self.writer.write(line)
+
+
+def _encode(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def _game_state(request):
+    """The game state of a join that creates its room; a ValueError when it is malformed."""
+    layout, robots, target = request["board"], request["robots"], request["target"]
+    if (not isinstance(layout, list)
+            or not all(isinstance(row, list) and all(isinstance(walls, str) for walls in row) for row in layout)):
+        raise ValueError("board must be a list of rows of wall strings")
+    if not isinstance(robots, dict) or not robots:
+        raise ValueError("robots must be an object of robot positions by color")
+    if not isinstance(target, list) or len(target) != 2:
+        raise ValueError("target must be a [color, [x, y]] pair")
+    return {
+        "board": layout,
+        "robots": {color: tuple(position) if isinstance(position, list) else position
+                   for color, position in robots.items()},
+        "target": (target[0], tuple(target[1]) if isinstance(target[1], list) else target[1]),
+    }
+
+
+class GameServer:
+    """
+    Hosts rooms for clients on a TCP or Unix socket. Moves are validated as
+    they arrive and broadcast once per event loop iteration per room, so a
+    burst of moves costs one message per player.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.address = address
+        self.rooms = {}
+        self._server = None
+        self._ids = itertools.count(1)
+        self._flush_scheduled = set()
+
+    async def start(self):
+        if isinstance(self.address, str):
+            self._server = await asyncio.start_unix_server(self._serve, self.address)
+        else:
+            self._server = await asyncio.start_server(self._serve, *self.address)
+            self.address = self._server.sockets[0].getsockname()[:2]
+        return self
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None and sock.family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        player = _Player(f"p{next(self._ids)}", writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    self.handle(player, line)
+        except ConnectionError:
+            pass
+        finally:
+            self._leave(player)
+            writer.close()
+
+    def handle(self, player, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("requests must be JSON objects")
+            op = request.get("op")
+            if op == "join":
+                self._join(player, request)
+            elif op == "move":
+                self._move(player, request)
+            elif op == "review":
+                self._review(player, request)
+            elif op == "leave":
+                self._leave(player)
+            else:
+                raise ValueError(f"unknown op {op!r}")
+        except (ValueError, KeyError, TypeError) as ex:
+            player.send(_encode({"event": "error", "error": str(ex)}))
+
+    def _join(self, player, request):
+        self._leave(player)
+        name = str(request["room"])
+        room = self.rooms.get(name)
+        if room is None:
+            if "board" in request:
+                game_state = _game_state(request)
+            else:
+                game_state = boards.random_puzzle()
+            room = self.rooms[name] = Room(name, game_state)
+        room.members.add(player)
+        player.room = room
+        self._send_state(player, room, room.step_count)
+
+    def _review(self, player, request):
+        room = player.room
+        if room is None:
+            raise ValueError("join a room first")
+        index = request["move"]
+        if not isinstance(index, int) or not 0 <= index <= room.step_count:
+            raise ValueError(f"no move {index!r} in this room")
+        self._send_state(player, room, index)
+
+    @staticmethod
+    def _send_state(player, room, index):
+        state = room.get_current_state(index)
+        player.send(_encode({"event": "state", "room": room.name, "board": state["board"],
+                             "robots": state["robots"], "target": state["target"],
+                             "moves": index}))
+
+    def _leave(self, player):
+        room = player.room
+        if room is None:
+            return
+        room.members.discard(player)
+        player.room = None
+        if not room.members:
+            del self.rooms[room.name]
+
+    def _move(self, player, request):
+        room = player.room
+        if room is None:
+            raise ValueError("join a room first")
+        color, direction = request["robot"], request["direction"]
+        stop = room.execute_move(color, direction)
+        room.pending.append((player.name, color, direction, room.puzzle.board.xy(stop)))
+        if room not in self._flush_scheduled:
+            self._flush_scheduled.add(room)
+            asyncio.get_running_loop().call_soon(self._flush, room)
+
+    def _flush(self, room):
+        self._flush_scheduled.discard(room)
+        if not room.pending:
+            return
+        line = _encode({"event": "moves", "room": room.name, "moves": room.pending,
+                        "solved": room.is_at_target()})
+        room.pending = []
+        for member in room.members:
+            member.send(line)
+
+
+class GameClient:
+    """Minimal asyncio client for GameServer, for tests and bots."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, address=DEFAULT_ADDRESS):
+        if isinstance(address, str):
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            reader, writer = await asyncio.open_connection(*address)
+        return cls(reader, writer)
+
+    def send(self, **request):
+        self.writer.write(_encode(request))
+
+    async def receive(self):
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("game server closed the connection")
+        return json.loads(line)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def _main(address):
+    server = await GameServer(address).start()
+    print(f"Game server listening on {server.address}")
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main(parse_address(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ADDRESS))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,255 @@
+"""
+Long-lived local solver daemon and its client.
+
+Run the daemon with: python service.py [host:port | /path/to/socket]
+
+The protocol is newline-delimited JSON. Each request is an object
+  {"id": 1, "board_id": "...", "board": [...], "robots": {...},
+   "target": [color, [x, y]], "options": {"time_budget": 2.0}}
+and is answered, in order, by {"id": 1, "path": [[color, direction], ...]}
+("path": null when no solution was found) or {"id": 1, "error": "..."}.
+"board" may be left out once the daemon has seen the board under its
+board_id; if it has been evicted the daemon answers with the error
+UNKNOWN_BOARD and the client sends it again.
+"""
+import collections
+import json
+import queue
+import socket
+import socketserver
+import sys
+import threading
+
+import ai
+from puzzles import board_id
+
+DEFAULT_ADDRESS = ("127.0.0.1", 8750)
+UNKNOWN_BOARD = "unknown board"
+# Number of boards the daemon keeps by id
+BOARD_CACHE_SIZE = 256
+# Requests in flight per connection during solve_many()
+PIPELINE_DEPTH = 64
+# Options a request may pass through to ai.solve()
+PLAY_OPTIONS = ("time_budget", "node_budget", "beam_width")
+
+
+def parse_address(text):
+    """'host:port' for TCP, anything else is a Unix socket path."""
+    host, _, port = text.rpartition(":")
+    if host and port.isdigit():
+        return host, int(port)
+    return text
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        if self.connection.family == socket.AF_INET:
+            # Answers to a pipelined window are written one by one; with
+            # Nagle's algorithm each waits for the client's delayed ACK.
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.answer(line)
+            self.wfile.write(json.dumps(response, separators=(",", ":")).encode() + b"\n")
+            self.wfile.flush()
+
+
+class SolverServer:
+    """
+    Serves solve requests on a TCP or Unix socket. Boards are cached by id so
+    the engine's per-board tables stay warm across requests and clients.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        if isinstance(address, str):
+            server_class = socketserver.ThreadingUnixStreamServer
+        else:
+            server_class = socketserver.ThreadingTCPServer
+        server_class.daemon_threads = True
+        server_class.allow_reuse_address = True
+        self.server = server_class(address, _Handler)
+        self.server.answer = self.answer
+        self.address = self.server.server_address
+        self.boards = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _board(self, request):
+        key = request.get("board_id")
+        board = request.get("board")
+        with self.lock:
+            if board is not None:
+                board = tuple(tuple(row) for row in board)
+                if key is not None:
+                    self.boards[key] = board
+            elif key in self.boards:
+                board = self.boards[key]
+            if key in self.boards:
+                self.boards.move_to_end(key)
+            while len(self.boards) > BOARD_CACHE_SIZE:
+                self.boards.popitem(last=False)
+        return board
+
+    def answer(self, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            board = self._board(request)
+            if board is None:
+                return {"id": request_id, "error": UNKNOWN_BOARD}
+            state = {
+                "board": board,
+                "robots": {color: tuple(position) for color, position in request["robots"].items()},
+                "target": (request["target"][0], tuple(request["target"][1])),
+            }
+            options = request.get("options") or {}
+            path = ai.solve(state, **{k: v for k, v in options.items() if k in PLAY_OPTIONS})
+            return {"id": request_id, "path": path}
+        except Exception as ex:
+            return {"id": request_id, "error": f"{type(ex).__name__}: {ex}"}
+
+
+class SolverError(Exception):
+    """The daemon could not solve a request."""
+
+
+class _Connection:
+
+    def __init__(self, address):
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(address)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.sock.makefile("rwb")
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+class SolverClient:
+    """
+    Client for SolverServer with a pool of persistent connections. solve()
+    sends one request; solve_many() pipelines a batch over one connection,
+    keeping up to PIPELINE_DEPTH requests in flight.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, pool_size=4):
+        self.address = address
+        self.pool = queue.LifoQueue(maxsize=pool_size)
+        self._next_id = 0
+        self._sent_boards = set()
+        self._lock = threading.Lock()
+
+    def close(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _acquire(self):
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            return _Connection(self.address)
+
+    def _release(self, connection):
+        try:
+            self.pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _request(self, state, options, with_board=False):
+        key = board_id(state["board"])
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            if key not in self._sent_boards:
+                self._sent_boards.add(key)
+                with_board = True
+        request = {
+            "id": request_id,
+            "board_id": key,
+            "robots": state["robots"],
+            "target": state["target"],
+            "options": options,
+        }
+        if with_board:
+            request["board"] = state["board"]
+        return request
+
+    def solve(self, state, **options):
+        return self.solve_many([state], **options)[0]
+
+    def solve_many(self, states, **options):
+        """
+        Solve a batch of states; returns one path per state, in order, None
+        where no solution was found.
+        """
+        states = list(states)
+        connection = self._acquire()
+        try:
+            responses = self._exchange(connection, [self._request(s, options) for s in states])
+            retry = [i for i, r in enumerate(responses) if r.get("error") == UNKNOWN_BOARD]
+            if retry:
+                again = self._exchange(connection, [self._request(states[i], options, True) for i in retry])
+                for i, response in zip(retry, again):
+                    responses[i] = response
+        except BaseException:
+            connection.close()
+            raise
+        self._release(connection)
+        paths = []
+        for response in responses:
+            if "error" in response:
+                raise SolverError(response["error"])
+            path = response["path"]
+            paths.append(None if path is None else [tuple(move) for move in path])
+        return paths
+
+    @staticmethod
+    def _exchange(connection, requests):
+        # Requests go out in windows of PIPELINE_DEPTH so neither side can
+        # block on a full socket buffer while the other is still writing.
+        responses = []
+        for i in range(0, len(requests), PIPELINE_DEPTH):
+            window = requests[i:i + PIPELINE_DEPTH]
+            connection.file.write(b"".join(json.dumps(r, separators=(",", ":")).encode() + b"\n"
+                                           for r in window))
+            connection.file.flush()
+            for _ in window:
+                line = connection.file.readline()
+                if not line:
+                    raise ConnectionError("solver daemon closed the connection")
+                responses.append(json.loads(line))
+        return responses
+
+
+if __name__ == "__main__":
+    address = parse_address(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ADDRESS
+    server = SolverServer(address)
+    print(f"Solver daemon listening on {server.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,475 @@
+"""
+Search algorithms over engine.Puzzle states.
+"""
+import array
+import collections
+import heapq
+import time
+
+import heuristics
+
+
+class LayeredSearch:
+    """
+    Breadth-first search that keeps its depth layers and every parent link
+    between consecutive layers, so all optimal solutions can be read back from
+    a single pass. With keep_all_edges=True every explored edge is recorded,
+    which also allows enumerating longer, non-optimal solutions.
+    """
+
+    def __init__(self, puzzle, keep_all_edges=False, budget=None):
+        self.puzzle = puzzle
+        self.keep_all_edges = keep_all_edges
+        self.budget = budget
+        self.depth = {puzzle.start: 0}
+        self.parents = {puzzle.start: []}  # state -> [(parent state, move)]
+        self.layers = [[puzzle.start]]
+        self.goals = []  # goal states in the order they were reached
+        self.exhausted = False
+
+    def expand(self):
+        """Expand the deepest layer. Returns the new layer (empty when exhausted)."""
+        d = len(self.layers)
+        depth = self.depth
+        parents = self.parents
+        is_goal = self.puzzle.is_goal
+        layer = []
+        for state in self.layers[-1]:
+            if d > 1 and is_goal(state):
+                continue  # solutions end at the first visit of a goal
+            if self.budget is not None:
+                self.budget.spend()
+            for move, child in self.puzzle.successors(state):
+                seen = depth.get(child)
+                if seen is None:
+                    depth[child] = d
+                    parents[child] = [(state, move)]
+                    layer.append(child)
+                    if is_goal(child):
+                        self.goals.append(child)
+                elif seen == d or self.keep_all_edges:
+                    parents[child].append((state, move))
+        if not layer:
+            self.exhausted = True
+        self.layers.append(layer)
+        return layer
+
+    def solve(self, max_depth=None):
+        """Expand layers until a goal is found. Returns the optimal length or None."""
+        if self.puzzle.is_goal(self.puzzle.start):
+            return 0
+        while not self.goals:
+            if self.exhausted or (max_depth is not None and len(self.layers) > max_depth):
+                return None
+            self.expand()
+        return self.depth[self.goals[0]]
+
+    def optimal_paths(self):
+        """Lazily yield every optimal solution as a list of encoded moves."""
+        length = self.solve()
+        if length is None:
+            return
+        depth = self.depth
+        for goal in [s for s in self.goals if depth[s] == length] or [self.puzzle.start]:
+            stack = [(goal, [])]
+            while stack:
+                state, suffix = stack.pop()
+                if state == self.puzzle.start:
+                    yield suffix
+                    continue
+                for parent, move in self.parents[state]:
+                    if depth[parent] == depth[state] - 1:
+                        stack.append((parent, [move] + suffix))
+
+    def shortest_paths(self, max_length=None):
+        """
+        Lazily yield distinct solutions in order of increasing length, extending
+        the search one layer at a time only when longer paths are requested.
+        Paths never revisit a state, pass through a goal early or immediately
+        reverse a robot's previous move (the game forbids that).
+        """
+        if not self.keep_all_edges:
+            raise ValueError("shortest_paths() needs keep_all_edges=True")
+        length = self.solve(max_depth=max_length)
+        if length is None:
+            return
+        if length == 0:
+            yield []
+            return
+        start = self.puzzle.start
+        while max_length is None or length <= max_length:
+            while len(self.layers) <= length and not self.exhausted:
+                self.expand()
+            if self.exhausted and length >= len(self.depth):
+                return  # a simple path cannot be longer than the state count
+            for goal in [s for s in self.goals if self.depth[s] <= length]:
+                yield from self._paths_of_length(goal, length, start)
+            length += 1
+
+    def _paths_of_length(self, goal, length, start):
+        depth = self.depth
+        is_goal = self.puzzle.is_goal
+        on_path = {goal}
+        suffix = []
+
+        def walk(state, remaining):
+            if remaining == 0:
+                if state == start:
+                    yield list(suffix)
+                return
+            for parent, move in self.parents[state]:
+                if depth[parent] > remaining - 1 or parent in on_path:
+                    continue
+                if is_goal(parent) and parent != start:
+                    continue
+                # Encoded moves m and m ^ 2 are the same robot in opposite directions
+                if suffix and suffix[0] == move ^ 2:
+                    continue
+                on_path.add(parent)
+                suffix.insert(0, move)
+                yield from walk(parent, remaining - 1)
+                suffix.pop(0)
+                on_path.discard(parent)
+
+        yield from walk(goal, length)
+
+
+def bfs(puzzle, budget=None):
+    """Return one optimal solution as encoded moves, or None when unsolvable."""
+    return next(LayeredSearch(puzzle, budget=budget).optimal_paths(), None)
+
+
+def multi_goal_search(puzzle, goals, budget=None):
+    """
+    One breadth-first search for many goals over the same start state, each
+    given as (robot index, cell); the puzzle's own target is ignored. Yields
+    (goal index, encoded moves) as soon as each goal is first reached, so in
+    order of increasing optimal length. Goals that cannot be reached are
+    never yielded.
+    """
+    by_robot = [collections.defaultdict(list) for _ in range(puzzle.count)]
+    remaining = 0
+    positions = puzzle.positions(puzzle.start)
+    for i, (robot, cell) in enumerate(goals):
+        if positions[robot] == cell:
+            yield i, []
+        else:
+            by_robot[robot][cell].append(i)
+            remaining += 1
+    parents = {puzzle.start: None}
+    layer = [puzzle.start]
+    mask = puzzle.mask
+    bits = puzzle.bits
+    while layer and remaining:
+        next_layer = []
+        for state in layer:
+            if budget is not None:
+                budget.spend()
+            for move, child in puzzle.successors(state):
+                if child in parents:
+                    continue
+                parents[child] = (state, move)
+                next_layer.append(child)
+                # Only the moved robot changed cell
+                robot = move >> 2
+                found = by_robot[robot].pop((child >> (bits * robot)) & mask, None)
+                if found:
+                    path = _trace_parents(parents, child)
+                    for i in found:
+                        yield i, path
+                    remaining -= len(found)
+        layer = next_layer
+
+
+def _trace_parents(parents, state):
+    path = []
+    while parents[state] is not None:
+        state, move = parents[state]
+        path.append(move)
+    path.reverse()
+    return path
+
+
+class BudgetExceeded(Exception):
+    """Raised inside a search when its Budget runs out."""
+
+
+class Budget:
+    """
+    Wall-clock and/or node limits shared by all phases of one solve, plus an
+    optional cancelled() callback for stopping a search from outside. Searches
+    call spend() once per expanded node; the clock and the callback are only
+    checked every CHECK_EVERY nodes to keep the overhead negligible.
+    """
+
+    CHECK_EVERY = 256
+
+    def __init__(self, seconds=None, nodes=None, cancelled=None):
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+        self.max_nodes = nodes
+        self.cancelled = cancelled
+        self.nodes = 0
+        self._unchecked = 0
+
+    def spend(self, nodes=1):
+        self.nodes += nodes
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded()
+        self._unchecked += nodes
+        if self._unchecked >= self.CHECK_EVERY:
+            self._unchecked = 0
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                raise BudgetExceeded()
+            if self.cancelled is not None and self.cancelled():
+                raise BudgetExceeded()
+
+
+def _trace(links, state):
+    """Follow per-depth {child: (parent, move)} links back to the start."""
+    path = []
+    for layer in reversed(links):
+        state, move = layer[state]
+        path.append(move)
+    path.reverse()
+    return path
+
+
+# Depth at which beam_search() gives up by default
+BEAM_MAX_DEPTH = 100
+
+
+def _beam_key(puzzle, heuristic):
+    """
+    Beam states are ranked by the best heuristic value the target robot can
+    reach in one real move, which rewards placing blockers, then by the
+    heuristic itself. Remaining ties are broken by a multiplicative hash of
+    the state, which keeps the beam diverse but deterministic.
+    """
+    target = (puzzle.target_robot,)
+
+    def key(state):
+        h = heuristic(state)
+        lookahead = min((heuristic(child) for _, child in puzzle.successors(state, target)),
+                        default=h)
+        return lookahead, h, (hash(state) * 2654435761) & 0xFFFFFFFF
+    return key
+
+
+def beam_search(puzzle, width, heuristic=None, budget=None, max_depth=BEAM_MAX_DEPTH):
+    """
+    Breadth-first search that keeps only the `width` states with the lowest
+    heuristic value in each layer. Fast but not optimal; returns encoded
+    moves or None. Like the game, paths never reverse a robot's previous move.
+
+    Only the states kept in a beam are remembered (for duplicate detection
+    and back links), so each layer costs O(width) time and space, whatever
+    the size of the board.
+    """
+    key = _beam_key(puzzle, heuristic or heuristics.TargetDistance(puzzle))
+    if puzzle.is_goal(puzzle.start):
+        return []
+    beam = [puzzle.start]
+    seen = {puzzle.start}
+    links = []
+    while beam and (max_depth is None or len(links) < max_depth):
+        layer = {}
+        incoming = links[-1] if links else {}
+        for state in beam:
+            if budget is not None:
+                budget.spend()
+            # The game forbids reversing the previous move of the same robot
+            reverse = incoming[state][1] ^ 2 if state in incoming else None
+            for move, child in puzzle.successors(state):
+                if move == reverse or child in seen or child in layer:
+                    continue
+                layer[child] = (state, move)
+                if puzzle.is_goal(child):
+                    links.append(layer)
+                    return _trace(links, child)
+        beam = heapq.nsmallest(width, layer, key=key)
+        seen.update(beam)
+        links.append({child: layer[child] for child in beam})
+    return None
+
+
+# Default memory cap of an IDAStar transposition table, in bytes
+TRANSPOSITION_TABLE_BYTES = 16 << 20
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of lower bounds on the number of moves left from a
+    state. Keys of up to 8 bytes live in an array of 64-bit ints, wider ones
+    as fixed-width records in a bytearray, and bounds in a bytearray, so
+    memory use is set by max_bytes alone. Each state hashes to a bucket of two
+    slots; a new entry takes the matching or an empty slot, else replaces the
+    one with the smaller bound, which is the cheaper subtree to search again.
+    """
+
+    def __init__(self, max_bytes=TRANSPOSITION_TABLE_BYTES, key_bytes=8):
+        self.key_bytes = max(key_bytes, 8)
+        self.slots = 2
+        while self.slots * 2 * (self.key_bytes + 1) <= max_bytes:
+            self.slots *= 2
+        self.bucket_mask = self.slots - 2
+        if self.key_bytes > 8:
+            self.get, self.store = self._get_wide, self._store_wide
+        self.clear()
+
+    def clear(self):
+        if self.key_bytes > 8:
+            self.keys = bytearray(self.key_bytes * self.slots)
+        else:
+            self.keys = array.array("Q", bytes(8 * self.slots))
+        self.bounds = bytearray(self.slots)  # 0 marks an empty slot
+
+    def _slot(self, state):
+        return ((state * 0x9E3779B97F4A7C15) >> 24) & self.bucket_mask
+
+    def get(self, state):
+        """The stored lower bound of a state, 0 if unknown."""
+        i = self._slot(state)
+        if self.keys[i] == state:
+            return self.bounds[i]
+        if self.keys[i + 1] == state:
+            return self.bounds[i + 1]
+        return 0
+
+    def store(self, state, bound):
+        keys = self.keys
+        bounds = self.bounds
+        i = self._slot(state)
+        if keys[i] != state and (keys[i + 1] == state or bounds[i] and bounds[i + 1] < bounds[i]):
+            i += 1
+        keys[i] = state
+        bounds[i] = min(bound, 0xFF)
+
+    def _get_wide(self, state):
+        n = self.key_bytes
+        i = self._slot(state)
+        key = state.to_bytes(n, "little")
+        if self.keys[i * n:(i + 1) * n] == key:
+            return self.bounds[i]
+        if self.keys[(i + 1) * n:(i + 2) * n] == key:
+            return self.bounds[i + 1]
+        return 0
+
+    def _store_wide(self, state, bound):
+        n = self.key_bytes
+        keys = self.keys
+        bounds = self.bounds
+        i = self._slot(state)
+        key = state.to_bytes(n, "little")
+        if keys[i * n:(i + 1) * n] != key and (
+                keys[(i + 1) * n:(i + 2) * n] == key or bounds[i] and bounds[i + 1] < bounds[i]):
+            i += 1
+        keys[i * n:(i + 1) * n] = key
+        bounds[i] = min(bound, 0xFF)
+
+
+class IDAStar:
+    """
+    Iterative-deepening A*. lower_bound always holds a proven lower bound on
+    the solution length, which stays valid if the budget interrupts run().
+
+    Every state whose subtree fails an iteration leaves a lower bound on its
+    remaining distance in a TranspositionTable of at most table_bytes. The
+    table is kept across iterations, so later iterations skip subtrees that
+    are already known to be too deep, and memory stays bounded however long
+    the search runs. Moves back to a state on the current path are cut.
+    """
+
+    def __init__(self, puzzle, heuristic=None, budget=None, table_bytes=TRANSPOSITION_TABLE_BYTES):
+        self.puzzle = puzzle
+        self.heuristic = heuristic or heuristics.BlockerDistance(puzzle)
+        self.budget = budget
+        self.lower_bound = self.heuristic(puzzle.start)
+        self.table = TranspositionTable(table_bytes, (puzzle.count * puzzle.bits + 7) // 8)
+        self._on_path = {}  # state -> g
+        self._path = []
+
+    def run(self, max_bound=None):
+        """Return an optimal solution, or None if none is at most max_bound long."""
+        bound = self.lower_bound
+        try:
+            while bound < heuristics.UNREACHABLE and (max_bound is None or bound <= max_bound):
+                self._on_path = {}
+                self._path = []
+                found = self._search(self.puzzle.start, 0, bound)
+                if found is True:
+                    self.table.clear()
+                    return list(self._path)
+                bound = found
+                self.lower_bound = bound
+        except BudgetExceeded:
+            # Entries of an unfinished iteration are not proven yet
+            self.table.clear()
+            raise
+        return None
+
+    def _search(self, state, g, bound):
+        """Returns True when a solution was found, else the smallest f over bound."""
+        table = self.table
+        h = self.heuristic(state)
+        learned = table.get(state)
+        f = g + (learned if learned > h else h)
+        if f > bound:
+            return f
+        if self.puzzle.is_goal(state):
+            return True
+        if self.budget is not None:
+            self.budget.spend()
+        on_path = self._on_path
+        on_path[state] = g
+        minimum = heuristics.UNREACHABLE
+        for move, child in self.puzzle.successors(state):
+            if child in on_path:
+                # A cycle. Once this iteration fails, that state is known to
+                # need more than bound - g' moves, so the cycle costs at least:
+                minimum = min(minimum, g + 1 + bound - on_path[child] + 1)
+                continue
+            self._path.append(move)
+            found = self._search(child, g + 1, bound)
+            if found is True:
+                return True
+            self._path.pop()
+            minimum = min(minimum, found)
+        del on_path[state]
+        table.store(state, minimum - g)
+        return minimum
+
+
+AnytimeResult = collections.namedtuple("AnytimeResult", "path optimal lower_bound")
+
+# Beam widths tried, in order, before the exact phase of anytime()
+ANYTIME_BEAM_WIDTHS = (16, 256, 1024)
+
+
+def anytime(puzzle, budget, widths=ANYTIME_BEAM_WIDTHS, heuristic=None):
+    """
+    Find a feasible solution quickly with increasingly wide beam searches, then
+    use IDA* to either find a shorter one or prove the best one optimal. When
+    the budget runs out the best path so far is returned with optimal=False.
+    heuristic must be admissible; it defaults to BlockerDistance.
+    """
+    h = heuristic or heuristics.BlockerDistance(puzzle)
+    best = None
+    lower_bound = h(puzzle.start)
+    exact = IDAStar(puzzle, h, budget)
+    try:
+        for width in widths:
+            if best is not None and len(best) <= lower_bound:
+                break
+            path = beam_search(puzzle, width, h, budget,
+                               max_depth=BEAM_MAX_DEPTH if best is None else len(best) - 1)
+            if path is not None:
+                best = path
+        if best is None or len(best) > lower_bound:
+            path = exact.run(max_bound=None if best is None else len(best) - 1)
+            if path is not None:
+                best = path
+        lower_bound = len(best) if best is not None else heuristics.UNREACHABLE
+    except BudgetExceeded:
+        lower_bound = max(lower_bound, exact.lower_bound)
+    optimal = best is not None and len(best) <= lower_bound
+    return AnytimeResult(best, optimal, lower_bound)
@@ -0,0 +1,62 @@
+"""
+Cold startup benchmark.
+
+Run it with: python startup.py [--runs N]
+
+Every run starts a fresh interpreter, as a player launching the game would,
+and reports two times from the start of the process:
+  first frame   main.py's GUI is created and its first frame drawn (with
+                SDL's dummy video driver, so no window opens)
+  first solve   the AI solves a generated puzzle, as the GUI's A key does
+The median and worst run of each are printed.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_FIRST_FRAME = """
+import sys, time
+sys.path[:0] = [{here!r}, {root!r}]
+import game
+gui = game.RicochetRobotsGUI()
+gui.update_screen()
+print(time.monotonic())
+"""
+
+_FIRST_SOLVE = """
+import sys, time
+sys.path[:0] = [{here!r}, {root!r}]
+import ai, rating
+ai.play(rating.generated_puzzle("startup", {index}), time_budget=2.0)
+print(time.monotonic())
+"""
+
+
+def _run(code, **env):
+    environment = dict(os.environ, **env)
+    started = time.monotonic()
+    output = subprocess.run([sys.executable, "-c", code], env=environment, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.split()[-1]) - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args(argv)
+    paths = {"here": HERE, "root": os.path.dirname(HERE)}
+    frames = [_run(_FIRST_FRAME.format(**paths), SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy")
+              for _ in range(args.runs)]
+    solves = [_run(_FIRST_SOLVE.format(index=i, **paths)) for i in range(args.runs)]
+    for name, times in (("first frame", frames), ("first solve", solves)):
+        print(f"{name}: median {statistics.median(times) * 1000:.0f} ms, "
+              f"worst {max(times) * 1000:.0f} ms over {len(times)} runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+On-disk cache of precomputed board tables.
+
+The move tables of a board (engine.get_board) and the distance tables of
+each target (heuristics) are rebuilt in every new process, which grows with
+the square of the board's side. With a cache directory set, each table is
+written once as <board id>-<name>.tbl (a small header, then uint16 values)
+and read back by later processes instead of being rebuilt.
+
+Set the RICOCHET_CACHE environment variable to a directory to enable the
+cache, or call configure().
+
+Worker processes configured with share=True memory-map the files instead
+of reading them into lists, so every process solving on a board uses the
+same pages, and the memory the tables take does not grow with the number
+of workers. share_layout() puts the board itself there too, so jobs can
+name their board by id instead of carrying it.
+"""
+import array
+import contextlib
+import functools
+import logging
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+from puzzles import board_id, decode_walls, encode_walls
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RRTC"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHI")
+
+# Shared tables with fewer values are still copied into lists: they take a
+# few KB per process, and indexing a list is faster (IDA* runs about 8%
+# slower on memory-mapped tables)
+SHARED_MIN_VALUES = 4096
+
+# Directory of the cached tables, None when caching is off
+cache_dir = os.environ.get("RICOCHET_CACHE") or None
+# Whether large tables are memory-mapped rather than read
+shared = False
+
+
+def configure(directory, share=False):
+    """
+    Cache tables in `directory` from now on; None turns caching off. With
+    share=True large tables are memory-mapped.
+    """
+    global cache_dir, shared
+    cache_dir = directory
+    shared = share
+
+
+@contextlib.contextmanager
+def shared_directory(directory=None):
+    """
+    A table directory for worker processes: `directory`, else the cache
+    directory, else a temporary directory removed on exit.
+    """
+    directory = directory or cache_dir
+    if directory is not None:
+        yield directory
+        return
+    directory = tempfile.mkdtemp(prefix="ricochet-tables-")
+    try:
+        yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None  # ValueError: an empty file
+    magic, version, count = _HEADER.unpack_from(data) if len(data) >= _HEADER.size else (None, None, 0)
+    if magic != MAGIC or version != VERSION or len(data) != _HEADER.size + 2 * count:
+        data.close()
+        return None
+    if shared and count >= SHARED_MIN_VALUES and sys.byteorder == "little":
+        return memoryview(data)[_HEADER.size:].cast("H")  # keeps the mapping open
+    values = array.array("H", data[_HEADER.size:])
+    data.close()
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tolist()
+
+
+def _write(path, values):
+    values = array.array("H", values)
+    if sys.byteorder != "little":
+        values.byteswap()
+    partial = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(partial, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(values)) + values.tobytes())
+        os.replace(partial, path)  # readers never see a half-written table
+    except OSError as ex:
+        logger.debug("Cannot cache %s: %s", path, ex)
+        return False
+    return True
+
+
+def _cached(directory, key, name, build):
+    path = os.path.join(directory, f"{key}-{name}.tbl")
+    values = _read(path)
+    if values is None:
+        values = build()
+        if _write(path, values) and shared:
+            values = _read(path) or values  # the mapping, not this process's copy
+    return values
+
+
+def cached(layout, name, build):
+    """
+    The table `name` of a board layout: a sequence of ints below 65536,
+    read from the cache, or returned by build() and then cached. Shared
+    tables are read-only memoryviews.
+    """
+    if cache_dir is None:
+        return build()
+    return _cached(cache_dir, board_id(layout), name, build)
+
+
+def share_layout(layout, directory=None):
+    """
+    Write a board layout to the cache, or another table directory, and
+    return the board id it is loaded by.
+    """
+    key = board_id(layout)
+    walls = encode_walls(tuple(map(tuple, layout)))
+    _cached(directory or cache_dir, key, "walls", lambda: [len(layout[0])] + list(walls))
+    return key
+
+
+@functools.lru_cache(maxsize=256)
+def shared_layout(key):
+    """The layout written by share_layout(); a KeyError when there is none."""
+    values = _read(os.path.join(cache_dir, f"{key}-walls.tbl"))
+    if values is None:
+        raise KeyError(key)
+    return decode_walls(bytes(list(values[1:])), values[0])
@@ -0,0 +1,79 @@
+import os
+import random
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+import ai  # noqa: E402
+import boards  # noqa: E402
+import service  # noqa: E402
+
+SEED = 5
+
+
+@pytest.fixture
+def server():
+    server = service.SolverServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def _puzzles(count):
+    rng = random.Random(SEED)
+    return [boards.random_puzzle(rng) for _ in range(count)]
+
+
+def test_solve_many_answers_in_request_order(server):
+    states = _puzzles(6)
+    with service.SolverClient(server.address) as client:
+        paths = client.solve_many(states, node_budget=20000)
+    assert paths == [ai.solve(state, node_budget=20000) for state in states]
+
+
+def test_evicted_board_is_sent_again(server):
+    state = _puzzles(1)[0]
+    with service.SolverClient(server.address) as client:
+        first = client.solve(state)
+        server.boards.clear()  # as if evicted by other clients' boards
+        assert client.solve(state) == first
+    assert len(server.boards) == 1
+
+
+def test_bad_request_raises_solver_error(server):
+    state = _puzzles(1)[0]
+    state["target"] = ("X", state["target"][1])  # no such robot
+    with service.SolverClient(server.address) as client:
+        with pytest.raises(service.SolverError):
+            client.solve(state)
+
+
+def test_malformed_lines_get_error_responses(server):
+    assert "error" in server.answer(b"not json\n")
+    response = server.answer(b'{"id": 7, "board_id": "unseen", "robots": {}, "target": ["R", [0, 0]]}\n')
+    assert response == {"id": 7, "error": service.UNKNOWN_BOARD}
+
+
+def test_unsolved_puzzle_has_no_path(server):
+    state = next(s for s in _puzzles(20) if ai.solve(s, node_budget=1) is None)
+    with service.SolverClient(server.address) as client:
+        assert client.solve(state, node_budget=1) is None
+
+
+def test_accepted_tcp_connections_disable_nagle(server, monkeypatch):
+    # Pipelined answers would otherwise wait for the client's delayed ACKs
+    nodelay = []
+    setup = service._Handler.setup
+
+    def recording_setup(handler):
+        setup(handler)
+        nodelay.append(handler.connection.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+
+    monkeypatch.setattr(service._Handler, "setup", recording_setup)
+    with service.SolverClient(server.address) as client:
+        client.solve(_puzzles(1)[0])
+    assert nodelay and all(nodelay)
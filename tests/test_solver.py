@@ -0,0 +1,74 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+import boards  # noqa: E402
+import engine  # noqa: E402
+import external  # noqa: E402
+import reachability  # noqa: E402
+import solver  # noqa: E402
+from model import RicochetRobotsGame  # noqa: E402
+
+SEED = 3
+PUZZLES = 30
+# Longest solution of the puzzles the exact solvers are compared on
+EXACT_MAX_MOVES = 6
+
+
+def _puzzles():
+    rng = random.Random(SEED)
+    return [boards.random_puzzle(rng) for _ in range(PUZZLES)]
+
+
+def _replay(state, moves):
+    """Play decoded moves by the game's rules; returns whether they reach the target."""
+    game = RicochetRobotsGame(state["board"], dict(state["robots"]), state["target"])
+    for color, direction in moves:
+        game.execute_move(color, direction)
+    return game.is_at_target()
+
+
+def test_beam_paths_are_legal_moves_of_the_game():
+    for state in _puzzles():
+        puzzle = engine.Puzzle.from_state(state)
+        for width in (4, 16):
+            path = solver.beam_search(puzzle, width)
+            if path is not None:
+                assert _replay(state, puzzle.decode(path)), (state["target"], width)
+
+
+def test_anytime_paths_are_legal_moves_of_the_game():
+    for state in _puzzles():
+        puzzle = engine.Puzzle.from_state(state)
+        result = solver.anytime(puzzle, solver.Budget(nodes=2000))
+        if result.path is not None:
+            assert _replay(state, puzzle.decode(result.path)), state["target"]
+
+
+def _solved(puzzle, path):
+    state = puzzle.start
+    for move in path:
+        state = dict(puzzle.successors(state))[move]
+    return puzzle.is_goal(state)
+
+
+def test_exact_solvers_find_optimal_solutions(tmp_path):
+    for state in _puzzles():
+        puzzle = engine.Puzzle.from_state(state)
+        search = solver.LayeredSearch(puzzle)
+        if search.solve(max_depth=EXACT_MAX_MOVES) is None:
+            continue  # longer puzzles would make the test slow
+        optimal = next(search.optimal_paths())
+        assert _solved(puzzle, optimal)
+        solutions = {
+            "ida": solver.IDAStar(puzzle).run(),
+            "anytime": solver.anytime(puzzle, None).path,
+            "external": external.bfs(puzzle, str(tmp_path)),
+        }
+        quick = reachability.quick_solve(puzzle)
+        if quick is not None:
+            solutions["quick_solve"] = quick
+        for name, path in solutions.items():
+            assert len(path) == len(optimal) and _solved(puzzle, path), (name, state["target"])